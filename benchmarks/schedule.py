@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Time the schedule analyses on a synthetic network.
+
+The network is built in memory, so no PMCS data is needed: every fifth
+activity is a milestone and the rest are tasks, and each activity after the
+first depends on two of the 200 before it. Reports the median time of
+critical path analysis, transitive reduction to the milestones and the
+Monte Carlo simulation.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from milestones import (  # noqa: E402
+    Milestone,
+    MilestoneTable,
+    analyse_schedule,
+    reduced_dependencies,
+    simulate,
+)
+
+
+def synthetic_network(n, seed=1):
+    rng = random.Random(seed)
+    base = datetime(2020, 1, 1)
+    activities = []
+    for i in range(n):
+        start = base + timedelta(days=rng.randint(0, 100))
+        finish = start + timedelta(days=rng.randint(0, 20))
+        tasktype = "Finish Milestone" if i % 5 == 0 else "Task Dependent"
+        activities.append(
+            Milestone(
+                f"T{i}",
+                tasktype,
+                f"Activity {i}",
+                "02C",
+                None,
+                finish,
+                finish,
+                start=start,
+            )
+        )
+    for i in range(1, n):
+        for _ in range(2):
+            j = rng.randrange(max(0, i - 200), i)
+            activities[j].successors.add(activities[i].code)
+            activities[i].predecessors.add(activities[j].code)
+    return activities
+
+
+def median_time(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--activities", type=int, default=50000, help="default=%(default)s"
+    )
+    parser.add_argument("--runs", type=int, default=3, help="default=%(default)s")
+    parser.add_argument(
+        "--trials",
+        type=int,
+        default=2000,
+        help="Monte Carlo trials, run in one process; default=%(default)s",
+    )
+    args = parser.parse_args()
+
+    activities = synthetic_network(args.activities)
+    table = MilestoneTable(activities)
+    target = activities[-1].code
+    milestones = [ms.code for ms in activities if "Milestone" in ms.tasktype]
+    benchmarks = {
+        "critical path": lambda: analyse_schedule(table, target),
+        "transitive reduction": lambda: reduced_dependencies(
+            activities, lambda ms: "Milestone" in ms.tasktype
+        ),
+        f"simulation ({args.trials} trials)": lambda: simulate(
+            activities, milestones, trials=args.trials, max_workers=1
+        ),
+    }
+    print(f"{args.activities} activities")
+    for label, function in benchmarks.items():
+        print(
+            f"{label}: {median_time(function, args.runs):.3f}s (median of {args.runs})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
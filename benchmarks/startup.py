@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""Guard against regressions in command line startup time.
+
+"milestones.py --help" should load nothing beyond the standard library,
+and take little longer than starting the interpreter; text-only subcommands
+should never import the plotting or Jira stacks. Neither check reads any
+PMCS data. Exits non-zero on failure.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which must not be imported to run the text-only subcommands.
+HEAVY_MODULES = ["matplotlib", "jira", "keyring"]
+
+# Modules which must not be imported just to parse the arguments.
+HELP_MODULES = HEAVY_MODULES + ["numpy", "xlrd", "yaml"]
+
+# Parse the arguments in-process, then report which of the given modules
+# were loaded.
+CHECK_HELP = """
+import runpy, sys
+sys.argv = ["milestones.py", "--help"]
+try:
+    runpy.run_path("milestones.py", run_name="__main__")
+except SystemExit:
+    pass
+print()
+print(" ".join(m for m in MODULES if m in sys.modules))
+"""
+
+# Look up the data loading functions, and each subcommand's function as the
+# command line does, then report which of the given modules were loaded.
+CHECK_COMMANDS = """
+import sys
+import milestones
+milestones.load_milestones
+for name in sys.argv[1:]:
+    getattr(milestones, name)
+print(" ".join(m for m in MODULES if m in sys.modules))
+"""
+
+
+def time_command(command, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def loaded_modules(check, modules, argv=()):
+    # The modules of the given list which the check script loaded.
+    return subprocess.run(
+        [sys.executable, "-c", f"MODULES = {modules!r}\n{check}"] + list(argv),
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        check=True,
+        text=True,
+    ).stdout.splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="default=%(default)s")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Maximum median seconds for each command, beyond the time taken "
+        "to start the interpreter; default=%(default)s",
+    )
+    parser.add_argument(
+        "commands",
+        nargs="*",
+        default=["delayed", "predecessors", "remaining"],
+        help="Text-only subcommands to check; default=%(default)s",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    interpreter = time_command([sys.executable, "-c", "pass"], args.runs)
+    print(f"interpreter: {interpreter:.3f}s (median of {args.runs})")
+    commands = {
+        "import milestones": [sys.executable, "-c", "import milestones"],
+        "milestones.py --help": [sys.executable, "milestones.py", "--help"],
+    }
+    for label, command in commands.items():
+        median = time_command(command, args.runs) - interpreter
+        print(f"{label}: +{median:.3f}s (median of {args.runs})")
+        if median > args.threshold:
+            print(f"{label} took more than {args.threshold}s")
+            failed = True
+
+    loaded = loaded_modules(CHECK_HELP, HELP_MODULES)
+    if loaded:
+        print(f"--help imported {loaded}")
+        failed = True
+
+    for command in args.commands:
+        loaded = loaded_modules(CHECK_COMMANDS, HEAVY_MODULES, [command])
+        if loaded:
+            print(f"{command} imported {loaded}")
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,26 @@ import sys
 from datetime import datetime
 
 import milestones
-from milestones.excel import load_f2due_pmcs_excel
-from milestones.utility import get_pmcs_path_months
+from milestones.options import (
+    GRANULARITIES,
+    HISTORY_FIELDS,
+    get_local_data_path,
+    get_pmcs_dir,
+)
+
+
+def handler(name):
+    # Subcommand functions are only looked up (and so their modules only
+    # imported) once the subcommand has been selected.
+    return lambda: getattr(milestones, name)
+
+
+def change(text):
+    # Parsed when given, so as not to import the what-if module otherwise.
+    try:
+        return milestones.parse_change(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
 
 
 def parse_args():
@@ -14,15 +32,30 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Prepare DM milestone summaries.")
     parser.add_argument(
         "--pmcs-data",
-        help=f"Path to PMCS Excel extract; default={milestones.get_latest_pmcs_path()}",
-        default=milestones.get_latest_pmcs_path(),
+        help=f"Path to PMCS Excel extract; default=latest in {get_pmcs_dir()}",
     )
     parser.add_argument(
         "--local-data",
-        help=f"Path to local annotations; default={milestones.get_local_data_path()}.",
-        default=milestones.get_local_data_path(),
+        help=f"Path to local annotations; default={get_local_data_path()}.",
+        default=get_local_data_path(),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-parse the PMCS extract rather than using the cache.",
     )
     parser.add_argument("--verbose", "-v", action="count", default=0)
+    parser.add_argument(
+        "--what-if",
+        metavar="CHANGE",
+        type=change,
+        action="append",
+        default=[],
+        help="Hypothetical change, e.g. 'DM-123 fdue +30d', passed on to every "
+        "downstream activity before generating the output; may be repeated.",
+    )
+
+    parser.set_defaults(load_tasks=False)
 
     subparsers = parser.add_subparsers(title="Output targets")
 
@@ -43,7 +76,7 @@ def parse_args():
     )
 
     celeb.add_argument("--inc", help="Top or Y", default="Top")
-    celeb.set_defaults(func=milestones.celeb)
+    celeb.set_defaults(func=handler("celeb"))
 
     gantt = subparsers.add_parser("gantt", help="Generate Gantt chart.")
     gantt.add_argument(
@@ -52,7 +85,17 @@ def parse_args():
         action="store_true",
     )
     gantt.add_argument("--output", help="Filename for output", default="gantt.tex")
-    gantt.set_defaults(func=milestones.gantt)
+    gantt.add_argument(
+        "--critical",
+        metavar="CODE",
+        help="Highlight the critical path to this milestone.",
+    )
+    gantt.add_argument(
+        "--reduce",
+        action="store_true",
+        help="Omit relations implied by others, following relations through tasks.",
+    )
+    gantt.set_defaults(func=handler("gantt"), ms_filter=handler("gantt_filter"))
 
     burndown = subparsers.add_parser(
         "burndown", help="Generate milestone burndown chart."
@@ -76,17 +119,51 @@ def parse_args():
     burndown.add_argument(
         "--output", help="Filename for output; default={filename}.", default=filename
     )
-    burndown.set_defaults(func=milestones.burndown)
+    burndown.set_defaults(
+        func=handler("burndown"), ms_filter=handler("burndown_filter")
+    )
     burndown.add_argument(
         "--prefix",
         help="List of prefixes for burndown milestones.",
         default="DM- DLP- LDM-503-",
     )
+    burndown.add_argument(
+        "--fan",
+        action="store_true",
+        help="Also draw the forecast from every earlier monthly extract.",
+    )
+    burndown.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes used to read new extracts; default=all CPUs.",
+    )
+    burndown.add_argument(
+        "--risk",
+        type=int,
+        metavar="PERCENTILE",
+        dest="risk_percentile",
+        help="Also draw this percentile of a Monte Carlo forecast, e.g. 80.",
+    )
+    burndown.add_argument(
+        "--trials",
+        type=int,
+        default=1000,
+        help="Number of trials for --risk; default=1000.",
+    )
+    burndown.add_argument(
+        "--granularity",
+        choices=GRANULARITIES,
+        default="monthly",
+        help="Interval at which open milestones are counted; default=monthly.",
+    )
     burndown.add_argument(
         "--months",
-        help="Specify number of months prior to use as forecast",
+        help="Numbers of months prior to use as forecasts, e.g. 1 3 6",
         type=int,
-        default=0,
+        nargs="+",
+        dest="horizons",
+        default=[],
     )
 
     csv = subparsers.add_parser(
@@ -96,13 +173,13 @@ def parse_args():
     csv.add_argument(
         "--output", help=f"Filename for output; default={filename}.", default=filename
     )
-    csv.set_defaults(func=milestones.csv)
+    csv.set_defaults(func=handler("csv"))
 
     jira = subparsers.add_parser("jira", help="Sync milestone details to Jira.")
     jira.add_argument(
         "--prompt", help="Prompt for username/password for jira.", action="store_true"
     )
-    jira.set_defaults(func=milestones.cjira)
+    jira.set_defaults(func=handler("cjira"))
 
     remaining = subparsers.add_parser(
         "remaining", help="Print a list of remaining milestones."
@@ -113,7 +190,9 @@ def parse_args():
         default=default_wbs,
         help=f"Include only milestones for this WBS; default={default_wbs}",
     )
-    remaining.set_defaults(func=milestones.remaining)
+    remaining.set_defaults(
+        func=handler("remaining"), ms_filter=handler("remaining_filter")
+    )
 
     delayed = subparsers.add_parser(
         "delayed", help="Print a list of delayed milestones."
@@ -130,12 +209,12 @@ def parse_args():
         default=as_of,
         help=f"Print incomplete milestones due by this date; default={as_of}",
     )
-    delayed.set_defaults(func=milestones.delayed)
+    delayed.set_defaults(func=handler("delayed"), ms_filter=handler("delayed_filter"))
 
     predecessors = subparsers.add_parser(
         "predecessors", help="List each milestone with its predecessors"
     )
-    predecessors.set_defaults(func=milestones.predecessors)
+    predecessors.set_defaults(func=handler("predecessors"))
 
     graph = subparsers.add_parser(
         "graph", help="Generate Graphviz dot showing milestone relationships."
@@ -146,7 +225,91 @@ def parse_args():
         default=default_wbs,
         help=f"Include only milestones for this WBS; default={default_wbs}",
     )
-    graph.set_defaults(func=milestones.graph)
+    graph.add_argument(
+        "--around",
+        metavar="CODE",
+        help="Show only the milestones within --depth relations of CODE, "
+        "regardless of WBS.",
+    )
+    graph.add_argument(
+        "--depth",
+        type=int,
+        default=1,
+        help="Number of relations to follow from --around; default=%(default)s",
+    )
+    graph.add_argument(
+        "--critical",
+        metavar="CODE",
+        help="Highlight the critical path to this milestone.",
+    )
+    graph.add_argument(
+        "--reduce",
+        action="store_true",
+        help="Omit relations implied by others, following relations through tasks.",
+    )
+    graph.set_defaults(func=handler("graph"))
+
+    critical = subparsers.add_parser(
+        "critical", help="Print the critical path to a milestone."
+    )
+    critical.add_argument("target", metavar="CODE", help="Milestone to analyse.")
+    critical.add_argument(
+        "--max-float",
+        type=int,
+        default=0,
+        help="Count activities with no more float (in days) than this; default=0.",
+    )
+    critical.set_defaults(func=handler("critical"), load_tasks=True)
+
+    impact = subparsers.add_parser(
+        "impact", help="List the milestones downstream of the given milestones."
+    )
+    impact.add_argument(
+        "codes", metavar="CODE", nargs="+", help="Milestones which slip."
+    )
+    impact.add_argument(
+        "--prefix",
+        help="List of prefixes for downstream milestones; default=LDM-503 SUM.",
+        default="LDM-503 SUM",
+    )
+    impact.set_defaults(func=handler("impact"))
+
+    whatif = subparsers.add_parser(
+        "whatif", help="List the forecasts moved by hypothetical changes."
+    )
+    whatif.add_argument(
+        "changes",
+        metavar="CHANGE",
+        nargs="+",
+        type=change,
+        help="Change to a date, e.g. 'DM-123 fdue +30d' or 'DM-123 fdue 2025-01-31'.",
+    )
+    whatif.set_defaults(func=handler("whatif"), load_tasks=True)
+
+    diff = subparsers.add_parser(
+        "diff", help="List the differences from an earlier PMCS extract."
+    )
+    diff.add_argument("--output", help="Filename for output", default="diff.csv")
+    diff.add_argument("--pmcs-comp", help="Filename for PMCS compare")
+    diff.add_argument(
+        "--months",
+        help="Number of months prior to compare with, unless --pmcs-comp is given; "
+        "default=1",
+        type=int,
+        default=1,
+    )
+    diff.add_argument(
+        "--format",
+        choices=["csv", "json"],
+        help="Output format; default from the output filename, else csv.",
+    )
+    diff.add_argument(
+        "--tasks",
+        dest="load_tasks",
+        action="store_true",
+        help="Compare all activities, not just milestones.",
+    )
+    diff.set_defaults(func=handler("diff"))
 
     #  RHL cartoon based on P6 "summary chart" and "celebratory milestone" entries
     blockschedule = subparsers.add_parser(
@@ -172,7 +335,11 @@ def parse_args():
     blockschedule.add_argument(
         "--show-weeks", help="Show week boundaries", action="store_true", default=False
     )
-    blockschedule.set_defaults(func=milestones.blockschedule)
+    blockschedule.set_defaults(
+        func=handler("blockschedule"),
+        ms_filter=handler("blockschedule_filter"),
+        load_tasks=True,
+    )
 
     #  K. Reil report for schedule
     report = subparsers.add_parser(
@@ -186,9 +353,11 @@ def parse_args():
     )
     report.add_argument(
         "--months",
-        help="Specify number of months prior to use as 3rd date",
+        help="Numbers of months prior to compare forecasts with; default=1 2",
         type=int,
-        default=2,
+        nargs="+",
+        dest="horizons",
+        default=[1, 2],
     )
     report.add_argument(
         "--start-date",
@@ -199,7 +368,59 @@ def parse_args():
             f"default={burndown_start}."
         ),
     )
-    report.set_defaults(func=milestones.report)
+    report.set_defaults(func=handler("report"), ms_filter=handler("report_filter"))
+
+    history = subparsers.add_parser(
+        "history",
+        help="Generate CSV of milestone dates across every monthly extract.",
+    )
+    history.add_argument("--output", help="Filename for output", default="history.csv")
+    history.add_argument(
+        "--prefix",
+        help="List of prefixes for history milestones.",
+        default="DM- DLP- LDM-503-",
+    )
+    history.add_argument(
+        "--field",
+        choices=HISTORY_FIELDS,
+        default="fdue",
+        help="Date to report for each extract; default=fdue.",
+    )
+    history.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes used to read new extracts; default=all CPUs.",
+    )
+    history.set_defaults(func=handler("history"))
+
+    risk = subparsers.add_parser(
+        "risk", help="Simulate the spread of milestone completion dates."
+    )
+    risk.add_argument("--output", help="Filename for output", default="risk.csv")
+    risk.add_argument(
+        "--prefix",
+        help="List of prefixes for reported milestones; default=LDM-503 SUM.",
+        default="LDM-503 SUM",
+    )
+    risk.add_argument(
+        "--trials", type=int, default=1000, help="Number of trials; default=1000."
+    )
+    risk.add_argument(
+        "--seed", type=int, default=0, help="Random number seed; default=0."
+    )
+    risk.add_argument(
+        "--no-history",
+        action="store_true",
+        help="Use a fixed slip distribution rather than fitting the history.",
+    )
+    risk.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes used for the trials; default=all CPUs.",
+    )
+    risk.set_defaults(func=handler("risk"), load_tasks=True)
 
     args = parser.parse_args()
 
@@ -209,16 +430,51 @@ def parse_args():
     if not hasattr(args, "func"):
         parser.print_usage()
         sys.exit(1)
+    if args.pmcs_data is None:
+        args.pmcs_data = milestones.get_latest_pmcs_path()
+    if getattr(args, "critical", None) or getattr(args, "reduce", False):
+        # The critical path, and the relations between milestones, run
+        # through tasks as well as milestones.
+        args.load_tasks = True
+    if getattr(args, "risk_percentile", None):
+        # The simulated burndown passes delays through the tasks.
+        args.load_tasks = True
     return args
 
 
 if __name__ == "__main__":
     args = parse_args()
     print("Working with " + args.pmcs_data)
-    load_tasks = args.func == milestones.blockschedule
-    milestones = milestones.load_milestones(args.pmcs_data, args.local_data, load_tasks)
-    if "months" in args and args.months > 0:
-        fpath = get_pmcs_path_months(args.pmcs_data, args.months)
-        load_f2due_pmcs_excel(fpath, milestones)
+    func = args.func()
+    ms_filter = args.ms_filter()(args) if "ms_filter" in args else None
+    if args.what_if:
+        try:
+            milestones = milestones.load_rescheduled(
+                args.pmcs_data,
+                args.local_data,
+                args.what_if,
+                args.load_tasks,
+                use_cache=not args.no_cache,
+                ms_filter=ms_filter,
+            )
+        except ValueError as e:
+            milestones.fail(f"--what-if: {e}")
+    else:
+        milestones = milestones.load_milestones(
+            args.pmcs_data,
+            args.local_data,
+            args.load_tasks,
+            use_cache=not args.no_cache,
+            ms_filter=ms_filter,
+        )
+    if "horizons" in args and args.horizons:
+        from milestones.excel import add_prior_forecasts, load_prior_forecasts
+        from milestones.utility import fail, get_pmcs_path_months
+
+        try:
+            paths = {h: get_pmcs_path_months(args.pmcs_data, h) for h in args.horizons}
+        except FileNotFoundError as e:
+            fail(str(e))
+        add_prior_forecasts(milestones, load_prior_forecasts(paths))
 
-    args.func(args, milestones)
+    func(args, milestones)
@@ -1,13 +1,144 @@
-from .blockschedule import *
-from .burndown import *
-from .celeb import *
-from .cjira import *
-from .csv import *
-from .delayed import *
-from .gantt import *
-from .graph import *
-from .milestone import *
-from .predecessors import *
-from .remaining import *
-from .report import *
-from .utility import *
+# The public names of the package, by the submodule which defines them.
+# Submodules are only imported when one of their names is first used, so
+# that (for example) the text-only subcommands never import Matplotlib or
+# the Jira client.
+import importlib
+import sys
+import types
+
+SUBMODULES = {
+    "blockschedule": [
+        "blockschedule",
+        "blockschedule_filter",
+        "create_blocks",
+        "process_milestones",
+    ],
+    "burndown": [
+        "Burndown",
+        "burndown",
+        "burndown_filter",
+        "compute_burndown",
+        "compute_fan",
+        "period_starts",
+        "plot_burndown",
+        "plot_fan",
+        "risk_burndown",
+    ],
+    "cache": ["SnapshotCache", "get_cache_dir", "load_pmcs_cached"],
+    "catalog": ["SnapshotCatalog", "get_catalog"],
+    "celeb": [
+        "BulletList",
+        "BulletListItem",
+        "Comparison",
+        "Paragraph",
+        "ReSTDocument",
+        "Section",
+        "Table",
+        "TableRow",
+        "TextAccumulator",
+        "add_context",
+        "celeb",
+        "completed_or_previosdue",
+        "generate_doc",
+        "underline",
+        "write_html",
+        "write_list",
+        "write_row",
+        "write_table",
+    ],
+    "cjira": ["cjira"],
+    "csv": ["csv"],
+    "dates": ["DateParser", "P6_DATE_FORMATS"],
+    "delayed": ["delayed", "delayed_filter"],
+    "depgraph": ["DependencyGraph"],
+    "diff": [
+        "FieldChange",
+        "SnapshotDiff",
+        "diff",
+        "diff_milestones",
+        "diff_snapshots",
+    ],
+    "filters": ["MilestoneFilter"],
+    "gantt": ["gantt", "gantt_embedded", "gantt_filter"],
+    "graph": ["graph"],
+    "history": ["HistoryStore", "history", "load_history", "read_snapshot"],
+    "milestone": ["Milestone", "MilestoneTable", "SlottedMilestone"],
+    "options": [
+        "GRANULARITIES",
+        "HISTORY_FIELDS",
+        "get_local_data_path",
+        "get_pmcs_dir",
+    ],
+    "overlay": ["Overlay", "load_overlay"],
+    "pmcsreader": ["PMCSReader"],
+    "predecessors": ["predecessors"],
+    "provenance": ["Provenance", "get_provenance"],
+    "reachability": ["ReachabilityIndex", "impact", "load_reachability"],
+    "readers": ["CsvReader", "XlsReader", "XlsxReader", "open_pmcs"],
+    "remaining": ["remaining", "remaining_filter"],
+    "report": ["report", "report_filter"],
+    "risk": ["RiskResult", "fit_slips", "load_slips", "risk", "simulate"],
+    "schedule": [
+        "Network",
+        "ScheduleAnalysis",
+        "analyse_schedule",
+        "critical",
+        "reduced_dependencies",
+        "topological_levels",
+        "transitive_reduction",
+    ],
+    "utility": [
+        "add_latex_citations",
+        "add_rst_citations",
+        "escape_latex",
+        "fail",
+        "find_pmcs_files",
+        "format_latex",
+        "get_latest_pmcs_path",
+        "get_pmcs_path_months",
+        "get_version_info",
+        "load_milestones",
+        "open_output",
+        "require_codes",
+        "write_output",
+    ],
+    "whatif": [
+        "Change",
+        "Reschedule",
+        "load_rescheduled",
+        "parse_change",
+        "reschedule",
+        "whatif",
+    ],
+    "xer": ["XerReader", "read_xer"],
+}
+
+EXPORTS = {name: module for module, names in SUBMODULES.items() for name in names}
+
+__all__ = sorted(EXPORTS)
+
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
+
+
+class LazyPackage(types.ModuleType):
+    # Importing a submodule binds it as an attribute of the package, which
+    # would hide a function of the same name (e.g. milestones.burndown).
+    # Those names always refer to the function, as they did when every
+    # submodule was star-imported.
+    def __setattr__(self, name, value):
+        if name in EXPORTS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = LazyPackage
@@ -28,6 +28,20 @@ from .cartoon_config import (
     today_height,
     wrappedDescrip,
 )
+from .filters import MilestoneFilter
+from .provenance import get_provenance
+
+__all__ = [
+    "blockschedule",
+    "blockschedule_filter",
+    "create_blocks",
+    "process_milestones",
+]
+
+
+def blockschedule_filter(args):
+    # Only Summary Chart activities and celebratory milestones are drawn.
+    return MilestoneFilter(charted=True)
 
 
 def blockschedule(args, milestones):
@@ -59,7 +73,9 @@ def blockschedule(args, milestones):
         else legend_location,
     )
 
-    plt.savefig(args.output)
+    plt.savefig(
+        args.output, metadata=get_provenance(args.pmcs_data).metadata(args.output)
+    )
 
 
 def create_blocks(activities, celebrations):
@@ -1,8 +1,185 @@
-from datetime import datetime
+import os
+from dataclasses import dataclass, field
+from typing import Dict
 
-import matplotlib.pyplot as plt
+import numpy
 
-__all__ = ["burndown"]
+from .filters import MilestoneFilter
+from .history import load_history
+from .provenance import get_provenance
+from .risk import load_slips, simulate
+
+__all__ = [
+    "Burndown",
+    "burndown",
+    "burndown_filter",
+    "compute_burndown",
+    "compute_fan",
+    "period_starts",
+    "plot_burndown",
+    "plot_fan",
+    "risk_burndown",
+]
+
+DATE_DTYPE = "datetime64[s]"
+
+
+def burndown_filter(args):
+    # The risk simulation runs through the whole network, so nothing can be
+    # left out when it is to be shown.
+    if args.risk_percentile:
+        return None
+    return MilestoneFilter(prefixes=tuple(args.prefix.split()))
+
+
+def period_starts(start_date, end_date, granularity="monthly"):
+    # The dates from start_date to end_date (inclusive) at which the open
+    # milestones are counted: every day, every seven days from the start,
+    # or the first of every month.
+    start = numpy.datetime64(start_date, "D")
+    end = numpy.datetime64(end_date, "D")
+    if granularity == "daily":
+        grid = numpy.arange(start, end + 1, dtype="datetime64[D]")
+    elif granularity == "weekly":
+        grid = numpy.arange(start, end + 1, 7, dtype="datetime64[D]")
+    elif granularity == "monthly":
+        months = numpy.arange(
+            start.astype("datetime64[M]"),
+            end.astype("datetime64[M]") + 1,
+            dtype="datetime64[M]",
+        )
+        grid = months.astype("datetime64[D]")
+        grid = grid[(grid >= numpy.datetime64(start_date)) & (grid <= end)]
+    else:
+        raise ValueError(f"Unknown granularity {granularity}")
+    return grid.astype(DATE_DTYPE)
+
+
+def remaining(dates, grid):
+    # Number of dates which are missing or later than each point on the
+    # grid. Sorting once makes this O((n + periods) log n).
+    dates = numpy.asarray(dates, dtype=DATE_DTYPE)
+    done = numpy.sort(dates[~numpy.isnat(dates)])
+    return len(dates) - numpy.searchsorted(done, grid, side="right")
+
+
+@dataclass
+class Burndown(object):
+    """Open milestone counts at each point of a period grid."""
+
+    periods: numpy.ndarray
+    baseline: numpy.ndarray
+    forecast: numpy.ndarray
+    achieved: numpy.ndarray
+    # Forecast counts from earlier snapshots, by horizon in months.
+    prior: Dict[int, numpy.ndarray] = field(default_factory=dict)
+    last_completed: numpy.datetime64 = numpy.datetime64("NaT")
+
+
+def compute_burndown(milestones, periods, horizons=()):
+    # Count the milestones still open at each of the given periods (as
+    # returned by period_starts()), against the baseline (due), current
+    # forecast (fdue), any prior forecasts and completion dates.
+    def column(values):
+        return numpy.array(values, dtype=DATE_DTYPE)
+
+    completed = column([ms.completed for ms in milestones])
+    done = completed[~numpy.isnat(completed)]
+    return Burndown(
+        periods=periods,
+        baseline=remaining(column([ms.due for ms in milestones]), periods),
+        forecast=remaining(column([ms.fdue for ms in milestones]), periods),
+        achieved=remaining(completed, periods),
+        prior={
+            # a milestone new since then counts as due on its due date
+            horizon: remaining(
+                column([ms.prior_fdue.get(horizon, ms.due) for ms in milestones]),
+                periods,
+            )
+            for horizon in horizons
+        },
+        last_completed=done.max() if len(done) else numpy.datetime64("NaT"),
+    )
+
+
+def compute_fan(store, milestones, periods, until=None):
+    # The forecast burndown according to each snapshot in a HistoryStore,
+    # up to and including the snapshot labelled until, as a dictionary of
+    # snapshot label to open milestone counts. Milestones which are not in
+    # a snapshot, or have no forecast in it, count as due on their due date.
+    due = numpy.array([ms.due for ms in milestones], dtype=DATE_DTYPE)
+    fdue = numpy.repeat(due[:, None], len(store.snapshots), axis=1)
+    known = [i for i, ms in enumerate(milestones) if ms.code in store]
+    if known:
+        rows = store.rows([milestones[i].code for i in known])
+        fdue[known] = store.dates["fdue"][rows]
+        fdue = numpy.where(numpy.isnat(fdue), due[:, None], fdue)
+    return {
+        label: remaining(fdue[:, col], periods)
+        for col, label in enumerate(store.snapshots)
+        if until is None or label <= until
+    }
+
+
+def risk_burndown(
+    milestones, network, periods, percentile, trials=1000, slips=(), max_workers=None
+):
+    # The given percentile, across the trials of a Monte Carlo simulation
+    # through network (all the activities, including tasks; see
+    # risk.simulate()), of the number of milestones open at each period.
+    result = simulate(
+        network,
+        [ms.code for ms in milestones],
+        trials=trials,
+        slips=slips,
+        max_workers=max_workers,
+    )
+    counts = numpy.array(
+        [remaining(trial, periods) for trial in result.dates().T.astype(DATE_DTYPE)]
+    )
+    return numpy.percentile(counts, percentile, axis=0)
+
+
+def plot_fan(fan, periods):
+    # One forecast line per snapshot, shaded from oldest to newest.
+    import matplotlib.pyplot as plt
+
+    periods = periods.astype(object)
+    colors = plt.cm.viridis(numpy.linspace(0, 1, max(len(fan), 1)))
+    labels = sorted(fan)
+    for i, (label, color) in enumerate(zip(labels, colors)):
+        legend = label if i in (0, len(labels) - 1) else None
+        plt.plot(periods, fan[label], color=color, linewidth=0.8, label=legend)
+
+
+def plot_burndown(result, output, metadata=None, fan=None, risk=None):
+    # Matplotlib is only imported when a chart is actually drawn.
+    import matplotlib.pyplot as plt
+
+    periods = result.periods.astype(object)
+    if fan:
+        plot_fan(fan, result.periods)
+    plt.plot(periods, result.baseline, label="Baseline")
+    if result.prior:
+        for horizon, counts in result.prior.items():
+            plt.plot(periods, counts, label=f"-{horizon}m Forecast")
+        plt.plot(periods, result.forecast, label="Forecast")
+    if risk is not None:
+        label, counts = risk
+        plt.plot(periods, counts, linestyle="--", label=label)
+
+    # Show achievements up to the first period after the last completion.
+    achieved = 0
+    if not numpy.isnat(result.last_completed):
+        achieved = (
+            numpy.searchsorted(result.periods, result.last_completed, "right") + 1
+        )
+    plt.plot(periods[:achieved], result.achieved[:achieved], label="Achieved")
+
+    plt.xlabel("Date")
+    plt.ylabel("Open Milestones")
+    plt.legend()
+    plt.savefig(output, metadata=metadata)
 
 
 def burndown(args, milestones):
@@ -15,81 +192,46 @@ def burndown(args, milestones):
 
     print(
         f"Burndown for milestones starting with {prefixes} using "
-        f"{args.months} prior forcast"
+        f"{args.horizons} month prior forecasts"
     )
 
+    # With --risk, every activity has been loaded, for the simulation.
+    network = milestones
     milestones = [
         ms
         for ms in milestones
-        for prefix in prefixes
-        if ms.code.startswith(prefix)
+        if ms.code.startswith(tuple(prefixes))
+        and "Milestone" in ms.tasktype
         and (ms.due and ms.due > start_date)
         and (not ms.completed or ms.completed > start_date)
     ]
 
-    dofcastline = args.months > 0
-
-    month_starts = []
-    for year in range(start_date.year, end_date.year + 1):
-        for month in range(1, 13):
-            dt = datetime(year, month, 1)
-            if start_date <= dt <= end_date:
-                month_starts.append(datetime(year, month, 1))
-
-    model = []
-    actual = []
-    fcast = []
-    f2cast = []
-    for date in month_starts:
-        f2cast_remain = fcast_remain = model_remain = actual_remain = len(milestones)
-        for ms in milestones:
-            if dofcastline and ms.f2due <= date:
-                f2cast_remain -= 1
-            if ms.fdue <= date:
-                fcast_remain -= 1
-            if ms.due <= date:
-                model_remain -= 1
-            if ms.completed and ms.completed <= date:
-                actual_remain -= 1
-
-        model.append(model_remain)
-        f2cast.append(f2cast_remain)
-        fcast.append(fcast_remain)
-        actual.append(actual_remain)
-
-    last_achieved_month = None
-    for ms in milestones:
-        if ms.completed and (
-            not last_achieved_month or last_achieved_month < ms.completed
-        ):
-            last_achieved_month = ms.completed
-
-    plt.plot(month_starts, model, label="Baseline")
-    if dofcastline:
-        plt.plot(month_starts, f2cast, label=f"-{args.months}m Forecast")
-        plt.plot(month_starts, fcast, label="Forecast")
-
-    achieved_months = [mnth for mnth in month_starts if mnth <= last_achieved_month]
-    # Need to acount for year wrap
-    if achieved_months[-1].month == 12:
-        achieved_months.append(
-            datetime(
-                achieved_months[-1].year + 1,
-                1,
-                achieved_months[-1].day,
-            )
-        )
-    else:
-        achieved_months.append(
-            datetime(
-                achieved_months[-1].year,
-                achieved_months[-1].month + 1,
-                achieved_months[-1].day,
-            )
+    periods = period_starts(start_date, end_date, args.granularity)
+    result = compute_burndown(milestones, periods, args.horizons)
+
+    fan = None
+    if args.fan:
+        store = load_history(args.pmcs_data, max_workers=args.jobs)
+        until = os.path.basename(args.pmcs_data)[:6]
+        fan = compute_fan(store, milestones, periods, until)
+
+    risk = None
+    if args.risk_percentile:
+        counts = risk_burndown(
+            milestones,
+            network,
+            periods,
+            args.risk_percentile,
+            trials=args.trials,
+            slips=load_slips(args.pmcs_data, max_workers=args.jobs),
+            max_workers=args.jobs,
         )
-    plt.plot(achieved_months, actual[: len(achieved_months)], label="Achieved")
+        risk = (f"P{args.risk_percentile} Forecast", counts)
 
-    plt.xlabel("Date")
-    plt.ylabel("Open Milestones")
-    plt.legend()
-    plt.savefig(args.output)
+    plot_burndown(
+        result,
+        args.output,
+        get_provenance(args.pmcs_data).metadata(args.output),
+        fan=fan,
+        risk=risk,
+    )
@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+from .excel import load_pmcs_excel
+from .milestone import Milestone
+from .readers import get_source_files
+
+__all__ = ["SnapshotCache", "get_cache_dir", "load_pmcs_cached"]
+
+# Bump this whenever the parsed representation changes (new Milestone
+# fields, different date handling in excel.py, ...) so that stale entries
+# are never returned.
+CACHE_VERSION = 2
+
+# Upper bound on the total size of the cache directory. Least recently used
+# entries are evicted once it is exceeded.
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+CACHE_SUFFIX = ".pmcs"
+
+# Only the attributes populated from PMCS are cached; local annotations are
+# applied afterwards on every run.
+PMCS_FIELDS = [
+    "code",
+    "tasktype",
+    "name",
+    "wbs",
+    "level",
+    "due",
+    "fdue",
+    "start",
+    "completed",
+    "celebrate",
+    "milestone_tracking",
+    "summarychart",
+    "predecessors",
+    "successors",
+]
+
+
+def get_cache_dir():
+    if "MILESTONES_CACHE_DIR" in os.environ:
+        return os.environ["MILESTONES_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(base, "milestones")
+
+
+def file_hash(filenames, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=20)
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(path):
+    # Hash of every file making up the extract at path.
+    return file_hash(get_source_files(path))
+
+
+def content_stat(path):
+    # Modification time and size of every file making up the extract at
+    # path: if unchanged, so (for all practical purposes) is its hash.
+    stats = (os.stat(filename) for filename in get_source_files(path))
+    return ";".join(f"{stat.st_mtime_ns}:{stat.st_size}" for stat in stats)
+
+
+class SnapshotCache(object):
+    """Size-bounded on-disk store of parsed PMCS snapshots.
+
+    Entries are keyed on the content hash of the workbook, so renaming or
+    touching a file does not invalidate it but any edit does.
+    """
+
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory or get_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, path, *flags):
+        return self.hash_key(content_hash(path), *flags)
+
+    def hash_key(self, digest, *flags):
+        parts = [f"v{CACHE_VERSION}", digest]
+        parts.extend(str(flag) for flag in flags)
+        return hashlib.blake2b("-".join(parts).encode(), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        filename = self._path(key)
+        try:
+            with open(filename, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.getLogger(__name__).warning(
+                f"Discarding unreadable cache entry {filename} ({e})"
+            )
+            self._remove(filename)
+            return None
+        # Mark as recently used for the purposes of eviction.
+        os.utime(filename)
+        return value
+
+    def put(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file and rename so that concurrent readers
+        # never see a partial entry.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(filename)
+            total -= size
+
+    @staticmethod
+    def _remove(filename):
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+
+def _pack(milestones):
+    return [tuple(getattr(ms, name) for name in PMCS_FIELDS) for ms in milestones]
+
+
+def _unpack(rows):
+    return [Milestone(**dict(zip(PMCS_FIELDS, row))) for row in rows]
+
+
+def load_pmcs_cached(path, load_tasks=False, cache=None, ms_filter=None):
+    # Equivalent to load_pmcs_excel(), but served from the snapshot cache
+    # when this exact workbook has been parsed before.
+    logger = logging.getLogger(__name__)
+    cache = cache or SnapshotCache()
+    key = cache.key(path, load_tasks, ms_filter.key() if ms_filter else None)
+
+    rows = cache.get(key)
+    if rows is not None:
+        logger.info(f"Loaded {path} from cache")
+        return _unpack(rows)
+
+    milestones = load_pmcs_excel(path, load_tasks, ms_filter=ms_filter)
+    try:
+        cache.put(key, _pack(milestones))
+    except OSError as e:
+        logger.warning(f"Unable to cache {path}: {e}")
+    return milestones
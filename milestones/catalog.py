@@ -0,0 +1,91 @@
+import glob
+import os
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+from .readers import READERS
+
+__all__ = ["SnapshotCatalog", "get_catalog"]
+
+
+def month_of(path):
+    # (year, month) of an extract named "YYYYMM-ME.<ext>".
+    label = os.path.basename(path)[:6]
+    return int(label[:4]), int(label[4:6])
+
+
+def month_ordinal(year, month):
+    return year * 12 + month - 1
+
+
+class SnapshotCatalog(object):
+    """The monthly PMCS extracts in a directory, indexed by (year, month).
+
+    The directory is scanned once. Looking up a given month is a dictionary
+    access, and finding the nearest snapshot to, or all snapshots within a
+    range of, months is a binary search. Months are calendar months, so a
+    month for which there is no extract never shifts the others.
+    """
+
+    def __init__(self, paths):
+        self._paths = dict(sorted(paths.items()))
+        self.months = list(self._paths)
+        self._ordinals = [month_ordinal(*month) for month in self.months]
+
+    @classmethod
+    def scan(cls, directory):
+        # One extract per month; if a month is available in several formats,
+        # the first listed in READERS is used.
+        paths = {}
+        for ext in READERS:
+            for path in sorted(glob.glob(os.path.join(directory, f"??????-ME{ext}"))):
+                paths.setdefault(month_of(path), path)
+        return cls(paths)
+
+    def __len__(self):
+        return len(self.months)
+
+    def __iter__(self):
+        return iter(self._paths.values())
+
+    def __contains__(self, month):
+        return month in self._paths
+
+    def __getitem__(self, month):
+        return self._paths[month]
+
+    def get(self, month, default=None):
+        return self._paths.get(month, default)
+
+    def latest(self):
+        return self._paths[self.months[-1]]
+
+    @staticmethod
+    def months_before(month, months):
+        # The calendar month the given number of months before month.
+        year, index = divmod(month_ordinal(*month) - months, 12)
+        return year, index + 1
+
+    def nearest_earlier(self, month, inclusive=True):
+        # The latest snapshot at or (if not inclusive) strictly before month,
+        # or None.
+        ordinal = month_ordinal(*month)
+        bisect = bisect_right if inclusive else bisect_left
+        i = bisect(self._ordinals, ordinal)
+        return self._paths[self.months[i - 1]] if i else None
+
+    def in_range(self, start, end):
+        # All snapshots from start to end, inclusive, in order.
+        i = bisect_left(self._ordinals, month_ordinal(*start))
+        j = bisect_right(self._ordinals, month_ordinal(*end))
+        return [self._paths[month] for month in self.months[i:j]]
+
+
+@lru_cache(maxsize=None)
+def _get_catalog(directory):
+    return SnapshotCatalog.scan(directory)
+
+
+def get_catalog(directory):
+    # The catalog of a directory, scanned once per process.
+    return _get_catalog(os.path.abspath(directory))
@@ -1,16 +1,35 @@
 import calendar
+import os
 import re
 import textwrap
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from io import StringIO
 
-from .utility import (
-    get_pmcs_path_months,
-    get_version_info,
-    load_milestones,
-    write_output,
-)
+from .excel import load_forecasts
+from .provenance import get_provenance
+from .utility import fail, get_pmcs_path_months, write_output
+
+__all__ = [
+    "BulletList",
+    "BulletListItem",
+    "Comparison",
+    "Paragraph",
+    "ReSTDocument",
+    "Section",
+    "Table",
+    "TableRow",
+    "TextAccumulator",
+    "add_context",
+    "celeb",
+    "completed_or_previosdue",
+    "generate_doc",
+    "underline",
+    "write_html",
+    "write_list",
+    "write_row",
+    "write_table",
+]
 
 HEADING_CHARS = '#=-^"'
 
@@ -143,7 +162,35 @@ class ReSTDocument(TextAccumulator):
         return super().get_result()
 
 
-def write_html(top_milestones, pmcs_data, comp_milestones, compline):
+class Comparison(object):
+    """Forecast dates of the milestones in the comparison snapshot.
+
+    Built once per document from the result of load_forecasts() and shared
+    between the RST and HTML outputs; the formatted dates are memoised, so
+    each is only produced once however many outputs use it.
+    """
+
+    def __init__(self, forecasts=None):
+        self.forecasts = forecasts or {}
+        self._formatted = {}
+
+    def __bool__(self):
+        return bool(self.forecasts)
+
+    def get(self, code):
+        return self.forecasts.get(code)
+
+    def format(self, code, date_format="%Y-%m-%d"):
+        # The comparison date of the milestone as text, or "" if it was not
+        # in the comparison snapshot.
+        key = (code, date_format)
+        if key not in self._formatted:
+            date = self.forecasts.get(code)
+            self._formatted[key] = date.strftime(date_format) if date else ""
+        return self._formatted[key]
+
+
+def write_html(top_milestones, provenance, comparison, compline):
     # simple html page for inclusion by communications
     # uses fdue - forecast date
     file_name = "top_milestones.html"
@@ -153,6 +200,7 @@ def write_html(top_milestones, pmcs_data, comp_milestones, compline):
         "<!DOCTYPE html>"
         "<!-- Simple page with the top milestones on it -->\n"
         '<html lang="en"> <head> <meta charset="utf-8">\n'
+        f'<meta name="generator" content="{provenance}">\n'
         '<link type="text/css" rel="stylesheet" href="https://fonts.googleapis.'
         'com/css?family=Raleway:300,500,700&amp;subset=latin" media="all" />\n'
         '<style type="text/css" media="all">\n'
@@ -177,29 +225,21 @@ def write_html(top_milestones, pmcs_data, comp_milestones, compline):
 
     for m in top_milestones:
         date = m.fdue.strftime("%d-%b-%Y")
-        completed = completed_or_previosdue(m, comp_milestones)
+        completed = completed_or_previosdue(m, comparison)
         print(
             f"<tr><td>{date}</td> " f"<td>{m.name}</td><td>{completed}</td>" "</tr>",
             file=ofile,
         )
 
-    sha, timestamp, p6_date = get_version_info(pmcs_data)
     print(
         f"</table>"
-        f"<p>Using {p6_date.strftime('%B %Y')} project controls data. {compline}</p>"
+        f"<p>Using {provenance.p6_date.strftime('%B %Y')} project controls data. "
+        f"{compline}</p>"
         f"</body>",
         file=ofile,
     )
 
 
-def find_comp(comps, code):
-    comp = None
-    for m in comps:
-        if m.code == code:
-            comp = m
-    return comp
-
-
 def write_row(b, code, name, due, comp):
     b.write_col(code)
     b.write_col(name)
@@ -207,41 +247,26 @@ def write_row(b, code, name, due, comp):
     b.write_col(comp)
 
 
-def completed_or_previosdue(ms, comp_milestones):
-    completed = ""
+def completed_or_previosdue(ms, comparison, date_format="%d-%b-%Y"):
     if ms.completed:
-        completed = "**Completed**"
-    else:
-        if comp_milestones:
-            cm = find_comp(comp_milestones, ms.code)
-            if cm:
-                date = cm.fdue.strftime("%d-%b-%Y")
-                completed = f"{date}"
-    return completed
+        return "**Completed**"
+    return comparison.format(ms.code, date_format)
 
 
-def write_table(my_section, milestones, comp_milestones):
+def write_table(my_section, milestones, comparison):
     # uses fdue - forecast date
     with my_section.table() as my_table:
         with my_table.row() as my_row:
             write_row(my_row, "Code", "Name", "Due", "Previously")
         for ms in milestones:
             with my_table.row() as my_row:
-                completed = ""
-                if ms.completed:
-                    completed = "**Completed**"
-                else:
-                    if comp_milestones:
-                        cm = find_comp(comp_milestones, ms.code)
-                        if cm:
-                            completed = f"{cm.fdue.strftime('%Y-%m-%d')}"
-
+                completed = completed_or_previosdue(ms, comparison, "%Y-%m-%d")
                 write_row(
                     my_row, ms.code, ms.name, ms.fdue.strftime("%Y-%m-%d"), completed
                 )
 
 
-def write_list(my_section, milestones, comp_milestones):
+def write_list(my_section, milestones, comparison):
     # uses fdue - forecast date
     with my_section.bullet_list() as my_list:
         for ms in milestones:
@@ -252,11 +277,8 @@ def write_list(my_section, milestones, comp_milestones):
                         completed = (
                             f" **Completed " f"{ms.completed.strftime('%Y-%m-%d')}**"
                         )
-                    if comp_milestones:
-                        cm = find_comp(comp_milestones, ms.code)
-                        cdate = "None"
-                        if cm:
-                            cdate = f"{cm.fdue.strftime('%Y-%m-%d')}"
+                    if comparison:
+                        cdate = comparison.format(ms.code) or "None"
                         p.write_line(
                             f"{cdate}-> **{ms.fdue.strftime('%Y-%m-%d')}** : "
                             f"{ms.name} ({ms.code}) {completed}"
@@ -270,7 +292,7 @@ def write_list(my_section, milestones, comp_milestones):
 
 def generate_doc(args, milestones):
     # pullout celebratory milestones - only Top or Y are the values
-    comp_milestones = None
+    comparison = Comparison()
     months = args.months
     comp_ym = []
     if args.pmcs_comp is not None:
@@ -279,31 +301,41 @@ def generate_doc(args, milestones):
                 f"Ignoring months argument ({months}) since "
                 f"pmcs_comp is set ({args.pmcs_comp})"
             )
-        comp_milestones = load_milestones(args.pmcs_comp, args.local_data)
+        comparison = Comparison(load_forecasts(args.pmcs_comp))
         comp_ym = re.findall(r"\(d{4}d{2}-", args.pmcs_comp)
     else:
         if months > 0:
-            comp_milestones = load_milestones(
-                get_pmcs_path_months(args.pmcs_data, months), args.local_data
-            )
+            try:
+                comp_path = get_pmcs_path_months(args.pmcs_data, months)
+            except FileNotFoundError as e:
+                fail(str(e))
+            comparison = Comparison(load_forecasts(comp_path))
 
     milestones = [ms for ms in milestones if ms.milestone_tracking == "Y"]
 
     milestones = sorted(milestones, key=lambda ms: ms.fdue)
 
+    provenance = get_provenance(args.pmcs_data)
     doc = ReSTDocument()
     with doc.section("Provenance") as my_section:
         with my_section.paragraph() as p:
-            sha, timestamp, p6_date = get_version_info(args.pmcs_data)
-            p.write_line(
-                f"This document was generated based on the contents of "
-                f"the `lsst-dm/milestones <https://github.com/lsst-dm/milestones>`_ "
-                f"repository, version "
-                f"`{sha[:8]} <https://github.com/lsst-dm/milestones/commit/{sha}>`_, "
-                f"dated {timestamp.strftime('%Y-%m-%d')}."
-            )
+            sha, timestamp, p6_date = provenance.as_tuple()
+            if sha:
+                p.write_line(
+                    f"This document was generated based on the contents of "
+                    f"the `lsst-dm/milestones <https://github.com/lsst-dm/milestones>`_ "
+                    f"repository, version "
+                    f"`{sha[:8]} <https://github.com/lsst-dm/milestones/commit/{sha}>`_, "
+                    f"dated {timestamp.strftime('%Y-%m-%d')}."
+                )
+            else:
+                # The extract is not under version control.
+                p.write_line(
+                    f"This document was generated based on the project controls "
+                    f"extract ``{os.path.basename(provenance.pmcs_path)}``."
+                )
             compline = ""
-            if comp_milestones:
+            if comparison:
                 if months > 0:
                     yr = p6_date.strftime("%Y")
                     mo = int(p6_date.strftime("%m")) - months
@@ -322,11 +354,11 @@ def generate_doc(args, milestones):
 
     with doc.section("Key milestones") as my_section:
         top_milestones = [ms for ms in milestones if ms.milestone_tracking == "Y"]
-        write_html(top_milestones, args.pmcs_data, comp_milestones, compline)
+        write_html(top_milestones, provenance, comparison, compline)
         if args.table:
-            write_table(my_section, top_milestones, comp_milestones)
+            write_table(my_section, top_milestones, comparison)
         else:
-            write_list(my_section, top_milestones, comp_milestones)
+            write_list(my_section, top_milestones, comparison)
         with my_section.paragraph() as p:
             p.write_line(
                 "A public HTML version for embedding is "
@@ -338,4 +370,9 @@ def generate_doc(args, milestones):
 
 def celeb(args, milestones):
     # pullout celebratory milestones - only Top or Y are the values
-    write_output("index.rst", generate_doc(args, milestones), comment_prefix="..")
+    write_output(
+        "index.rst",
+        generate_doc(args, milestones),
+        comment_prefix="..",
+        provenance=get_provenance(args.pmcs_data),
+    )
@@ -2,6 +2,7 @@ from csv import DictWriter
 from datetime import datetime, timedelta
 from io import StringIO
 
+from .provenance import get_provenance
 from .utility import write_output
 
 __all__ = ["csv"]
@@ -57,4 +58,6 @@ def csv(args, milestones):
             except Exception:
                 pass
         writer.writerow(to_write)
-    write_output(args.output, output.getvalue())
+    write_output(
+        args.output, output.getvalue(), provenance=get_provenance(args.pmcs_data)
+    )
@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime
+from functools import lru_cache
+
+__all__ = ["DateParser", "P6_DATE_FORMATS"]
+
+# Formats in which Primavera writes dates to the Excel extracts, and to XER
+# files.
+P6_DATE_FORMATS = ["%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y", "%Y-%m-%d %H:%M"]
+
+
+def _fixed_mdy(value):
+    # "MM/DD/YYYY"
+    if len(value) == 10 and value[2] == value[5] == "/":
+        digits = value[0:2] + value[3:5] + value[6:10]
+        if digits.isdigit():
+            return datetime(int(value[6:10]), int(value[0:2]), int(value[3:5]))
+    return None
+
+
+def _fixed_mdy_hms_p(value):
+    # "MM/DD/YYYY HH:MM:SS AM"
+    if (
+        len(value) == 22
+        and value[2] == value[5] == "/"
+        and value[13] == value[16] == ":"
+        and value[10] == value[19] == " "
+        and value[20:] in ("AM", "PM")
+    ):
+        digits = value[0:2] + value[3:5] + value[6:10] + value[11:13]
+        digits += value[14:16] + value[17:19]
+        hour = int(value[11:13])
+        if digits.isdigit() and 1 <= hour <= 12:
+            return datetime(
+                int(value[6:10]),
+                int(value[0:2]),
+                int(value[3:5]),
+                hour % 12 + (12 if value[20:] == "PM" else 0),
+                int(value[14:16]),
+                int(value[17:19]),
+            )
+    return None
+
+
+def _fixed_ymd_hm(value):
+    # "YYYY-MM-DD HH:MM"
+    if len(value) == 16 and value[4] == value[7] == "-" and value[13] == ":":
+        digits = value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16]
+        if value[10] == " " and digits.isdigit():
+            return datetime(
+                int(value[0:4]),
+                int(value[5:7]),
+                int(value[8:10]),
+                int(value[11:13]),
+                int(value[14:16]),
+            )
+    return None
+
+
+# Slicing fast paths for zero-padded values; anything they do not recognise
+# falls through to strptime.
+FIXED_OFFSET_PARSERS = {
+    "%m/%d/%Y %I:%M:%S %p": _fixed_mdy_hms_p,
+    "%m/%d/%Y": _fixed_mdy,
+    "%Y-%m-%d %H:%M": _fixed_ymd_hm,
+}
+
+
+class DateParser(object):
+    """Parse P6 date strings, memoising the results.
+
+    The same handful of dates recur many times within an extract and across
+    monthly snapshots, so parsed values are held in a bounded LRU cache.
+    When a whole column is parsed the format of its first value is taken as
+    the likely format of the rest and tried first.
+    """
+
+    def __init__(self, formats=P6_DATE_FORMATS, maxsize=1 << 16):
+        self.formats = list(formats)
+        self._parse = lru_cache(maxsize=maxsize)(self._parse_uncached)
+
+    def __call__(self, value):
+        return self._parse(value)
+
+    def _try_format(self, value, fmt):
+        fixed = FIXED_OFFSET_PARSERS.get(fmt)
+        if fixed:
+            try:
+                result = fixed(value)
+            except ValueError:
+                result = None
+            if result:
+                return result
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            return None
+
+    def _parse_uncached(self, value):
+        # Some readers return cells which are already dates.
+        if isinstance(value, datetime):
+            return value
+        for fmt in self.formats:
+            result = self._try_format(value, fmt)
+            if result:
+                return result
+        logger = logging.getLogger(__name__)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Couldn't parse '{value}' as date")
+        raise ValueError(f"'{value}' does not match any of {self.formats}")
+
+    def sniff(self, values):
+        # Move the format of the first non-empty value to the front.
+        for value in values:
+            if isinstance(value, datetime):
+                return None
+            if value:
+                for fmt in self.formats:
+                    if self._try_format(value, fmt):
+                        self.formats.remove(fmt)
+                        self.formats.insert(0, fmt)
+                        return fmt
+                return None
+        return None
+
+    def parse_column(self, values):
+        # Parse a whole column; empty cells become None. Unparsable values
+        # raise ValueError, as for a single value.
+        self.sniff(values)
+        seen = {}
+        result = []
+        for value in values:
+            if not value:
+                result.append(None)
+                continue
+            parsed = seen.get(value)
+            if parsed is None:
+                parsed = seen[value] = self._parse(value)
+            result.append(parsed)
+        return result
@@ -1,4 +1,10 @@
-__all__ = ["delayed"]
+from .filters import MilestoneFilter
+
+__all__ = ["delayed", "delayed_filter"]
+
+
+def delayed_filter(args):
+    return MilestoneFilter(wbs=args.wbs)
 
 
 def delayed(args, milestones):
@@ -0,0 +1,147 @@
+from collections import deque
+from itertools import chain
+
+import numpy
+
+__all__ = ["DependencyGraph"]
+
+
+class DependencyGraph(object):
+    """Predecessor/successor relationships between PMCS activities.
+
+    Task codes are interned to consecutive integer ids and the edges are
+    held in compressed sparse row form in both directions, so looking up
+    the neighbours of an activity costs O(degree) regardless of the size of
+    the network.
+    """
+
+    def __init__(self, codes, pred_ids, succ_ids):
+        self.codes = list(codes)
+        self.ids = {code: i for i, code in enumerate(self.codes)}
+
+        n = len(self.codes)
+        pred_ids = numpy.asarray(pred_ids, dtype=numpy.int64)
+        succ_ids = numpy.asarray(succ_ids, dtype=numpy.int64)
+
+        # Drop duplicate relations; numpy.unique also leaves the edges sorted
+        # by predecessor, then successor.
+        edges = numpy.unique(pred_ids * n + succ_ids)
+        self.pred_ids, self.succ_ids = edges // n, edges % n
+
+        self._succ_ptr, self._succ = self._csr(self.pred_ids, self.succ_ids, n)
+        self._pred_ptr, self._pred = self._csr(self.succ_ids, self.pred_ids, n)
+
+    @staticmethod
+    def _csr(rows, cols, n):
+        order = numpy.argsort(rows, kind="stable")
+        ptr = numpy.zeros(n + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(rows, minlength=n), out=ptr[1:])
+        return ptr, cols[order]
+
+    @classmethod
+    def from_relations(cls, preds, succs, codes=()):
+        # Build from parallel sequences of predecessor and successor codes
+        # (i.e. the columns of the TASKPRED sheet) in a single pass.
+        # Any codes given explicitly are interned first, in order.
+        ids = {}
+        for code in codes:
+            ids.setdefault(code, len(ids))
+        pred_ids = [ids.setdefault(str(code), len(ids)) for code in preds]
+        succ_ids = [ids.setdefault(str(code), len(ids)) for code in succs]
+        return cls(ids, pred_ids, succ_ids)
+
+    @classmethod
+    def from_milestones(cls, milestones):
+        # Build from the predecessor and successor sets of the milestones,
+        # which reflect any overrides made in the local annotations: the
+        # overlay changes a relation at both of its ends, so taking the
+        # union of the two sides does not restore one it has removed.
+        preds, succs = [], []
+        for ms in milestones:
+            for code in ms.predecessors:
+                preds.append(code)
+                succs.append(ms.code)
+            for code in ms.successors:
+                preds.append(ms.code)
+                succs.append(code)
+        return cls.from_relations(preds, succs, [ms.code for ms in milestones])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.ids
+
+    @property
+    def num_edges(self):
+        return len(self.pred_ids)
+
+    def successor_ids(self, i):
+        return self._succ[self._succ_ptr[i] : self._succ_ptr[i + 1]]
+
+    def predecessor_ids(self, i):
+        return self._pred[self._pred_ptr[i] : self._pred_ptr[i + 1]]
+
+    @staticmethod
+    def _gather(ptr, values, ids):
+        # The concatenated neighbours of every id in ids, without a Python
+        # loop over them.
+        ids = numpy.asarray(ids, dtype=numpy.int64)
+        counts = ptr[ids + 1] - ptr[ids]
+        offsets = numpy.repeat(ptr[ids] - (numpy.cumsum(counts) - counts), counts)
+        return values[offsets + numpy.arange(counts.sum())]
+
+    def successor_ids_of(self, ids):
+        return self._gather(self._succ_ptr, self._succ, ids)
+
+    def predecessor_ids_of(self, ids):
+        return self._gather(self._pred_ptr, self._pred, ids)
+
+    def subgraph(self, n):
+        # The relations between the first n ids only.
+        keep = (self.pred_ids < n) & (self.succ_ids < n)
+        return DependencyGraph(self.codes[:n], self.pred_ids[keep], self.succ_ids[keep])
+
+    def reversed(self):
+        # The same activities with every relation reversed.
+        return DependencyGraph(self.codes, self.succ_ids, self.pred_ids)
+
+    def neighbour_ids(self, i):
+        # Predecessors and successors of i, in id order.
+        return numpy.union1d(self.predecessor_ids(i), self.successor_ids(i))
+
+    def neighbourhood_ids(self, i, depth, through=None):
+        # Ids of the activities within depth relations of i, in either
+        # direction, including i itself. Only that part of the network is
+        # visited. Passing through an activity for which the boolean mask
+        # through is set does not count as a relation, so that, e.g.,
+        # milestones related via tasks are one relation apart.
+        distance = {i: 0}
+        queue = deque([i])
+        while queue:
+            k = queue.popleft()
+            for j in map(int, chain(self.predecessor_ids(k), self.successor_ids(k))):
+                d = distance[k] + (0 if through is not None and through[j] else 1)
+                if d <= depth and d < distance.get(j, depth + 1):
+                    distance[j] = d
+                    # Free steps are explored before the rest at the same
+                    # distance, so each id is settled when first dequeued.
+                    if d == distance[k]:
+                        queue.appendleft(j)
+                    else:
+                        queue.append(j)
+        return set(distance)
+
+    def successors(self, code):
+        if code not in self.ids:
+            return []
+        return [self.codes[i] for i in self.successor_ids(self.ids[code])]
+
+    def predecessors(self, code):
+        if code not in self.ids:
+            return []
+        return [self.codes[i] for i in self.predecessor_ids(self.ids[code])]
+
+    def edges(self):
+        for pred, succ in zip(self.pred_ids, self.succ_ids):
+            yield self.codes[pred], self.codes[succ]
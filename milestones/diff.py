@@ -0,0 +1,162 @@
+import json
+import os
+from csv import writer
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from io import StringIO
+from typing import List, Tuple
+
+from .provenance import get_provenance
+from .utility import fail, get_pmcs_path_months, load_milestones, write_output
+
+__all__ = ["FieldChange", "SnapshotDiff", "diff", "diff_milestones", "diff_snapshots"]
+
+# Fields compared between the versions of an activity present in both
+# snapshots. Dates are compared to the day.
+DIFF_FIELDS = ["name", "wbs", "due", "fdue", "completed"]
+
+
+@dataclass
+class FieldChange(object):
+    code: str
+    field: str
+    old: str
+    new: str
+
+
+@dataclass
+class SnapshotDiff(object):
+    """Differences between two snapshots.
+
+    Added and removed activities are given as (code, name); changed fields
+    as FieldChange; relations as (predecessor, successor) pairs. Each list
+    is sorted.
+    """
+
+    added: List[Tuple[str, str]] = field(default_factory=list)
+    removed: List[Tuple[str, str]] = field(default_factory=list)
+    changed: List[FieldChange] = field(default_factory=list)
+    added_edges: List[Tuple[str, str]] = field(default_factory=list)
+    removed_edges: List[Tuple[str, str]] = field(default_factory=list)
+
+    def rows(self):
+        # One row of (change, code, field, old, new) per difference; a
+        # relation appears as its predecessor's successor.
+        for code, name in self.added:
+            yield "added", code, "name", "", name
+        for code, name in self.removed:
+            yield "removed", code, "name", name, ""
+        for c in self.changed:
+            yield "changed", c.code, c.field, c.old, c.new
+        for pred, succ in self.added_edges:
+            yield "added", pred, "successor", "", succ
+        for pred, succ in self.removed_edges:
+            yield "removed", pred, "successor", succ, ""
+
+
+def field_value(ms, name):
+    value = getattr(ms, name)
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return "" if value is None else str(value)
+
+
+def edges_of(milestones):
+    # Every relation recorded on the activities, as (predecessor, successor)
+    # pairs. A relation between two loaded activities is recorded on both.
+    edges = set()
+    for ms in milestones:
+        edges.update((pred, ms.code) for pred in ms.predecessors)
+        edges.update((ms.code, succ) for succ in ms.successors)
+    return edges
+
+
+def diff_milestones(old, new, fields=DIFF_FIELDS):
+    # Compare two lists of activities with a hash join on their codes, and
+    # their relations as sets of code pairs, so the cost is linear in the
+    # number of activities and relations.
+    old_by_code = {ms.code: ms for ms in old}
+    new_by_code = {ms.code: ms for ms in new}
+
+    result = SnapshotDiff()
+    for code, ms in new_by_code.items():
+        before = old_by_code.get(code)
+        if before is None:
+            result.added.append((code, ms.name))
+            continue
+        for name in fields:
+            old_value, new_value = field_value(before, name), field_value(ms, name)
+            if old_value != new_value:
+                result.changed.append(FieldChange(code, name, old_value, new_value))
+    result.removed = [
+        (code, ms.name) for code, ms in old_by_code.items() if code not in new_by_code
+    ]
+
+    old_edges, new_edges = edges_of(old), edges_of(new)
+    result.added_edges = sorted(new_edges - old_edges)
+    result.removed_edges = sorted(old_edges - new_edges)
+    result.added.sort()
+    result.removed.sort()
+    result.changed.sort(key=lambda c: (c.code, fields.index(c.field)))
+    return result
+
+
+def diff_snapshots(
+    old_path, new_path, local_data_path, load_tasks=False, use_cache=True
+):
+    # The differences between two PMCS extracts, each with the local
+    # annotations applied.
+    old, new = (
+        load_milestones(path, local_data_path, load_tasks, use_cache=use_cache)
+        for path in (old_path, new_path)
+    )
+    return diff_milestones(old, new)
+
+
+def diff(args, milestones):
+    comp_path = args.pmcs_comp
+    if not comp_path:
+        try:
+            comp_path = get_pmcs_path_months(args.pmcs_data, args.months)
+        except FileNotFoundError as e:
+            fail(str(e))
+    elif not os.path.exists(comp_path):
+        fail(f"No PMCS extract {comp_path}")
+    print(f"Comparing with {comp_path}")
+    old = load_milestones(
+        comp_path, args.local_data, args.load_tasks, use_cache=not args.no_cache
+    )
+    result = diff_milestones(old, milestones)
+    print(
+        f"{len(result.added)} added, {len(result.removed)} removed, "
+        f"{len(result.changed)} changed fields, {len(result.added_edges)} added "
+        f"and {len(result.removed_edges)} removed relations"
+    )
+
+    output_format = args.format or ("json" if args.output.endswith(".json") else "csv")
+    if output_format == "json":
+        # JSON has no comments, so the provenance is part of the document.
+        print(f"Writing output to {args.output}")
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "old": comp_path,
+                    "new": args.pmcs_data,
+                    "provenance": str(get_provenance(args.pmcs_data)),
+                    **asdict(result),
+                },
+                f,
+                indent=2,
+            )
+        return
+
+    output = StringIO()
+    csv_writer = writer(output)
+    csv_writer.writerow(["change", "code", "field", "old", "new"])
+    csv_writer.writerows(result.rows())
+    write_output(
+        args.output,
+        output.getvalue(),
+        comment_prefix="#",
+        provenance=get_provenance(args.pmcs_data),
+    )
@@ -1,41 +1,47 @@
-import logging
 import re
-import sys
-from datetime import datetime
-
-import numpy
-import xlrd
+from concurrent.futures import ProcessPoolExecutor
 
+from .dates import DateParser
+from .depgraph import DependencyGraph
 from .milestone import Milestone
+from .pmcsreader import RELATION_SHEET_NAME, TASK_SHEET_NAME
+from .readers import open_pmcs
 
 __all__ = ["load_pmcs_excel"]
 
-TASK_SHEET_NAME = "TASK"
-RELATION_SHEET_NAME = "TASKPRED"
-
-# Skip the first two rows, which always contain header information.
-START_ROW = 2
-
-
-class CellFetcher(object):
-    def __init__(self, hdr):
-        self._hdr = [cell.value for cell in hdr]
-
-    def __call__(self, field_name, row):
-        position = self._hdr.index(field_name)
-        return row[position].value
-
-
-def extract_date(value):
-    try:
-        return datetime.strptime(value, "%m/%d/%Y %I:%M:%S %p")
-    except ValueError:
-        try:
-            return datetime.strptime(value, "%m/%d/%Y")
-        except ValueError:
-            logger = logging.getLogger(__name__)
-            logger.debug(f"Couldn't parse '{value}' as date")
-            raise
+# Fields read from the TASK table, in the order of the arguments of
+# make_milestone().
+TASK_FIELDS = [
+    "task_code",
+    "task_type",
+    "task_name",
+    "user_field_859",
+    "status_code",
+    "act_end_date",
+    "base_end_date",
+    "start_date",
+    "end_date",
+    "wbs_id",
+    "actv_code_celebratory_achievements_id",
+    "actv_code_milestone_tracking_id",
+    "actv_code_summary_chart_id",
+]
+
+# Positions of act_end_date, base_end_date, start_date and end_date in
+# TASK_FIELDS.
+DATE_COLUMNS = [5, 6, 7, 8]
+
+# Positions of status_code and act_end_date in TASK_FIELDS.
+STATUS_COLUMN, ACT_END_COLUMN = 4, 5
+
+# Positions of task_code, task_type, wbs_id, the celebratory achievements
+# and the summary chart codes, as expected by MilestoneFilter.select().
+FILTER_COLUMNS = [0, 1, 9, 10, 12]
+
+
+# Shared between loads so that the memoised dates carry over between the
+# current snapshot and any comparison snapshots.
+parse_date = DateParser()
 
 
 def extract_wbs(value):
@@ -45,144 +51,219 @@ def extract_wbs(value):
         return ""
 
 
-def extract_fcast(task_sheet, milestones):
-    # get forceast dates from sheet
-    # go through all milestones and add the f2date
-    assert task_sheet.name == TASK_SHEET_NAME
-    fetcher = CellFetcher(task_sheet.row(0))
-    fdates = {}
-    for rownum in range(START_ROW, task_sheet.nrows):
-        d = fetcher("end_date", task_sheet.row(rownum))
-        code = fetcher("task_code", task_sheet.row(rownum))
-        try:
-            f2due = extract_date(d)
-            fdates[code] = f2due
-        except ValueError:
-            pass
-
-    print(f"Got {len(fdates)} forecast dates")
-    for m in milestones:
-        if m.code in fdates:
-            m.f2due = fdates[m.code]
-        else:  # could be a new milestone not there n months ago
-            m.f2due = m.due
-
-    return milestones
-
-
-def extract_task_details(task_sheet, load_tasks):
-    assert task_sheet.name == TASK_SHEET_NAME
+def resolve_dates(tasktype, base_end_date, start_date, end_date):
+    # There are three possible end dates:
+    #
+    #   base_end_date - according to the baseline project
+    #   end_date      - the end date in the current project (which floats
+    #                   as dependencies get late, etc)
+    #   start_date    - the start date in the current project (as above,
+    #                   will be the same as the end_date for zero duration
+    #                   activities like milestones.
+    #
+    # All arrive already parsed, or None where the cell was empty.
+
+    start, due, fdue = start_date, base_end_date, end_date
+
+    if not due and fdue:
+        due = fdue
+    if not due:
+        if tasktype.startswith("Start"):
+            due = start
+    if not fdue and due:
+        fdue = due
+    return start, due, fdue
+
+
+def resolve_completed(code, status, act_end_date, base_end_date, start_date):
+    if status != "Completed":
+        return None
+    if act_end_date:
+        return act_end_date
+    elif base_end_date:
+        return base_end_date
+    elif start_date:
+        return start_date
+    raise ValueError(f"{code} is completed with no date")
+
+
+def completed_only(statuses, act_end_dates):
+    # The actual end date is only used for completed activities, so for a
+    # column of them it is dropped (and never parsed) for the others: a
+    # malformed value there must not fail the load.
+    return [
+        value if status == "Completed" else None
+        for status, value in zip(statuses, act_end_dates)
+    ]
+
+
+def make_milestone(
+    code,
+    tasktype,
+    name,
+    level,
+    status,
+    act_end_date,
+    base_end_date,
+    start_date,
+    end_date,
+    wbs_id,
+    celebrate,
+    milestone_tracking,
+    summarychart,
+):
+    # Build a Milestone from the cell values of a single TASK row, with the
+    # date columns already parsed by DateParser.
+
+    # "user_field_859" is just a magic value extracted from the spreadsheet
+    level = int(float(level)) if level else None
+
+    start, due, fdue = resolve_dates(tasktype, base_end_date, start_date, end_date)
+
+    completed = resolve_completed(code, status, act_end_date, base_end_date, start_date)
+
+    return Milestone(
+        code,
+        tasktype,
+        name,
+        extract_wbs(wbs_id),
+        level,
+        due,
+        fdue,
+        start,
+        completed,
+        celebrate,
+        milestone_tracking,
+        summarychart,
+    )
+
+
+def extract_task_rows(rows, load_tasks, ms_filter=None):
+    # Build milestones one TASK row at a time, so that streaming readers
+    # never need to hold the whole table in memory.
     milestones = list()
-    fetcher = CellFetcher(task_sheet.row(0))
-    for rownum in range(START_ROW, task_sheet.nrows):
-        tasktype = fetcher("task_type", task_sheet.row(rownum))
+    for row in rows:
         # File now has milestones and tasks many things only want milestones
-        if not (load_tasks or "Milestone" in tasktype):
+        if not (load_tasks or "Milestone" in row[1]):
+            continue
+        if ms_filter and not ms_filter.select(*([row[i]] for i in FILTER_COLUMNS)):
             continue
-        code = fetcher("task_code", task_sheet.row(rownum))
-        name = fetcher("task_name", task_sheet.row(rownum))
-
-        # "user_field_859" is just a magic value extracted from the spreadsheet
-        level = fetcher("user_field_859", task_sheet.row(rownum))
-        level = int(level) if level else None
-
-        # There are three possible end dates:
-        #
-        #   base_end_date - according to the baseline project
-        #   end_date      - the end date in the current project (which floats
-        #                   as dependencies get late, etc)
-        #   start_date    - the start date in the current project (as above,
-        #                   will be the same as the end_date for zero duration
-        #                   activities like milestones.
-
-        status = fetcher("status_code", task_sheet.row(rownum))
-        act_end_date = fetcher("act_end_date", task_sheet.row(rownum))
-        base_end_date = fetcher("base_end_date", task_sheet.row(rownum))
-        start_date = fetcher("start_date", task_sheet.row(rownum))
-        end_date = fetcher("end_date", task_sheet.row(rownum))
-
-        start = due = fdue = None
-
-        if start_date:
-            start = extract_date(start_date)
-        if base_end_date:
-            due = extract_date(base_end_date)
-        if end_date:
-            fdue = extract_date(end_date)
-
-        if not due and fdue:
-            due = fdue
-        if not due:
-            if tasktype.startswith("Start"):
-                due = start
-        if not fdue and due:
-            fdue = due
-        completed = None
-        if status == "Completed":
-            if act_end_date:
-                completed = extract_date(act_end_date)
-            elif base_end_date:
-                completed = extract_date(base_end_date)
-            elif start_date:
-                completed = extract_date(start_date)
-            else:
-                raise ValueError(f"{code} is completed with no date")
-
-        wbs = extract_wbs(fetcher("wbs_id", task_sheet.row(rownum)))
-        celebrate = fetcher(
-            "actv_code_celebratory_achievements_id", task_sheet.row(rownum)
-        )
-        milestone_tracking = ""
-        if "actv_code_milestone_tracking_id" in fetcher._hdr:
-            milestone_tracking = fetcher(
-                "actv_code_milestone_tracking_id", task_sheet.row(rownum)
-            )
-        summarychart = fetcher("actv_code_summary_chart_id", task_sheet.row(rownum))
-
-        milestones.append(
-            Milestone(
-                code,
-                tasktype,
-                name,
-                wbs,
-                level,
-                due,
-                fdue,
-                start,
-                completed,
-                celebrate,
-                milestone_tracking,
-                summarychart,
-            )
-        )
+        row = list(row)
+        if row[STATUS_COLUMN] != "Completed":
+            row[ACT_END_COLUMN] = None
+        for i in DATE_COLUMNS:
+            row[i] = parse_date(row[i]) if row[i] else None
+        milestones.append(make_milestone(*row))
 
     return milestones
 
 
-def set_successors(milestones, relation_sheet):
-    assert relation_sheet.name == RELATION_SHEET_NAME
-    pred_col = relation_sheet.row_values(0).index("pred_task_id")
-    succ_col = relation_sheet.row_values(0).index("task_id")
-    preds = numpy.array(relation_sheet.col_values(pred_col))[START_ROW:]
-    succs = numpy.array(relation_sheet.col_values(succ_col))[START_ROW:]
-    for ms in milestones:
-        for i in numpy.where(preds == ms.code)[0]:
-            ms.successors.add(succs[i])
-        for i in numpy.where(succs == ms.code)[0]:
-            ms.predecessors.add(preds[i])
+def extract_task_columns(columns, load_tasks, ms_filter=None):
+    # Build milestones from whole TASK columns (in the order of
+    # TASK_FIELDS), which lets the dates be parsed column by column.
+    tasktypes = columns[1]
+
+    # File now has milestones and tasks many things only want milestones
+    if not load_tasks:
+        keep = [i for i, tasktype in enumerate(tasktypes) if "Milestone" in tasktype]
+        columns = [[column[i] for i in keep] for column in columns]
 
+    # Apply the filter to the raw values, so rows which are not wanted are
+    # never date-parsed or turned into milestones.
+    if ms_filter:
+        keep = ms_filter.select(*(columns[i] for i in FILTER_COLUMNS))
+        columns = [[column[i] for i in keep] for column in columns]
 
-def load_pmcs_excel(path, load_tasks=False):
-    workbook = xlrd.open_workbook(path, logfile=sys.stderr)
-    milestones = extract_task_details(workbook.sheets()[0], load_tasks)
-    set_successors(milestones, workbook.sheets()[1])
+    columns = list(columns)
+    columns[ACT_END_COLUMN] = completed_only(
+        columns[STATUS_COLUMN], columns[ACT_END_COLUMN]
+    )
+    for i in DATE_COLUMNS:
+        columns[i] = parse_date.parse_column(columns[i])
+
+    return [make_milestone(*row) for row in zip(*columns)]
+
+
+def set_successors(milestones, reader):
+    preds, succs = reader.columns(RELATION_SHEET_NAME, ["pred_task_id", "task_id"])
+    graph = DependencyGraph.from_relations(preds, succs)
+    for ms in milestones:
+        ms.successors.update(graph.successors(ms.code))
+        ms.predecessors.update(graph.predecessors(ms.code))
+    return graph
+
+
+def load_pmcs_excel(path, load_tasks=False, columnar=None, ms_filter=None):
+    # Load milestones from a PMCS extract in any of the formats handled by
+    # readers.py. By default, extracts which have to be read whole are
+    # processed column by column and streamed formats row by row.
+    with open_pmcs(path) as reader:
+        if columnar is None:
+            columnar = not reader.streaming
+        if columnar:
+            columns = reader.columns(TASK_SHEET_NAME, TASK_FIELDS)
+            milestones = extract_task_columns(columns, load_tasks, ms_filter)
+        else:
+            rows = reader.rows(TASK_SHEET_NAME, TASK_FIELDS)
+            milestones = extract_task_rows(rows, load_tasks, ms_filter)
+        set_successors(milestones, reader)
     return milestones
 
 
-def load_f2due_pmcs_excel(fpath, milestones):
-    # given milestones, load the sheet from N months prior
-    # set fdue2 to the forecast date from the file
-    print(f"Loading forecast from {fpath}")
-    workbook = xlrd.open_workbook(fpath, logfile=sys.stderr)
-    milestones = extract_fcast(workbook.sheets()[0], milestones)
+def load_pmcs_columns(path, columns, milestones_only=False):
+    # Projection of the TASK table: return the requested columns for each
+    # row, keyed by task_code. Only the TASK table is read; the relations
+    # and any other sheets are never parsed.
+    with open_pmcs(path) as reader:
+        rows = reader.rows(TASK_SHEET_NAME, ["task_code", "task_type"] + columns)
+        if milestones_only:
+            return {row[0]: row[2:] for row in rows if "Milestone" in row[1]}
+        return {row[0]: row[2:] for row in rows}
+
+
+def load_forecasts(path):
+    # Forecast (fdue) date of each milestone in the given workbook, derived
+    # exactly as load_pmcs_excel() would, but without building milestones.
+    columns = load_pmcs_columns(
+        path,
+        ["task_type", "base_end_date", "start_date", "end_date"],
+        milestones_only=True,
+    )
+    codes = list(columns)
+    tasktypes = [row[0] for row in columns.values()]
+    dates = [
+        parse_date.parse_column([row[i] for row in columns.values()]) for i in (1, 2, 3)
+    ]
+    return {
+        code: resolve_dates(*row)[2] for code, row in zip(codes, zip(tasktypes, *dates))
+    }
+
+
+def load_prior_forecasts(paths, max_workers=None):
+    # Forecast dates from several earlier snapshots, given as a dictionary
+    # of horizon (in months) to path. The snapshots are read in parallel.
+    # Returns a dictionary of horizon to {code: fdue}.
+    horizons = list(paths)
+    for horizon in horizons:
+        print(f"Loading {horizon} month prior forecast from {paths[horizon]}")
+    if len(horizons) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(load_forecasts, [paths[h] for h in horizons])
+            forecasts = dict(zip(horizons, results))
+    else:
+        forecasts = {h: load_forecasts(paths[h]) for h in horizons}
+    for horizon in horizons:
+        print(f"Got {len(forecasts[horizon])} {horizon} month prior forecast dates")
+    return forecasts
+
+
+def add_prior_forecasts(milestones, forecasts):
+    # Attach the result of load_prior_forecasts() to the milestones.
+    # Milestones which are new since a snapshot have no entry for it.
+    for ms in milestones:
+        ms.prior_fdue = {
+            horizon: fdates[ms.code]
+            for horizon, fdates in forecasts.items()
+            if ms.code in fdates
+        }
     return milestones
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional, Tuple
+
+from .excel import extract_wbs
+
+__all__ = ["MilestoneFilter"]
+
+
+@dataclass(frozen=True)
+class MilestoneFilter(object):
+    """Selection of milestones to be applied while loading a PMCS extract.
+
+    Every criterion given must hold for a milestone to be kept:
+
+    ``prefixes``
+        The code starts with one of these.
+    ``wbs``
+        The WBS element starts with this.
+    ``tasktypes``
+        The task type contains one of these (e.g. ``"Milestone"``).
+    ``charted``
+        The activity has a summary chart or celebratory milestone entry.
+
+    Milestones listed in ``codes`` are always read from the extract; they
+    are still subject to the filter once local annotations have been
+    applied.
+    """
+
+    prefixes: Tuple[str, ...] = ()
+    wbs: Optional[str] = None
+    tasktypes: Tuple[str, ...] = ()
+    charted: bool = False
+    codes: FrozenSet[str] = field(default_factory=frozenset)
+
+    def key(self):
+        # Stable description, suitable for use in a cache key.
+        return repr(
+            (
+                self.prefixes,
+                self.wbs,
+                self.tasktypes,
+                self.charted,
+                tuple(sorted(self.codes)),
+            )
+        )
+
+    def with_codes(self, codes):
+        return MilestoneFilter(
+            self.prefixes,
+            self.wbs,
+            self.tasktypes,
+            self.charted,
+            self.codes | frozenset(codes),
+        )
+
+    def select(self, codes, tasktypes, wbs_ids, celebrates, summarycharts):
+        # Indices of the rows to keep, evaluated on the raw TASK sheet
+        # columns. The cheapest tests are applied first.
+        keep = range(len(codes))
+        if self.prefixes:
+            prefixes = tuple(self.prefixes)
+            keep = [i for i in keep if codes[i].startswith(prefixes)]
+        if self.tasktypes:
+            keep = [
+                i
+                for i in keep
+                if any(tasktype in tasktypes[i] for tasktype in self.tasktypes)
+            ]
+        if self.charted:
+            keep = [i for i in keep if summarycharts[i] or celebrates[i]]
+        if self.wbs is not None:
+            wbs = {}
+            for i in keep:
+                if wbs_ids[i] not in wbs:
+                    wbs[wbs_ids[i]] = extract_wbs(wbs_ids[i]).startswith(self.wbs)
+            keep = [i for i in keep if wbs[wbs_ids[i]]]
+        if self.codes:
+            kept = set(keep)
+            keep = [i for i in range(len(codes)) if i in kept or codes[i] in self.codes]
+        return list(keep)
+
+    def __call__(self, ms):
+        # Apply the same criteria to a loaded Milestone.
+        if self.prefixes and not ms.code.startswith(tuple(self.prefixes)):
+            return False
+        if self.tasktypes and not any(t in ms.tasktype for t in self.tasktypes):
+            return False
+        if self.charted and not (ms.summarychart or ms.celebrate):
+            return False
+        if self.wbs is not None and not ms.wbs.startswith(self.wbs):
+            return False
+        return True
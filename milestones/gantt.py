@@ -1,9 +1,13 @@
 from datetime import datetime
 from io import StringIO
 
-from .utility import format_latex, write_output
+from .depgraph import DependencyGraph
+from .filters import MilestoneFilter
+from .provenance import get_provenance
+from .schedule import analyse_schedule, reduced_dependencies
+from .utility import format_latex, require_codes, write_output
 
-__all__ = ["gantt", "gantt_embedded"]
+__all__ = ["gantt", "gantt_embedded", "gantt_filter"]
 
 # Milestones with these prefixes are included when generating Gantt charts.
 # Note that some are not DM milestones, but are included for context.
@@ -87,7 +91,17 @@ GANTT_POSTAMBLE_STANDALONE = """
 """
 
 
-def format_gantt(milestones, preamble, postamble, start=datetime(2017, 7, 1)):
+def format_gantt(
+    milestones,
+    preamble,
+    postamble,
+    start=datetime(2017, 7, 1),
+    critical=(),
+    dependencies=None,
+):
+    # Milestones whose codes are in critical, and the links between them,
+    # are highlighted. The links are taken from dependencies, if given,
+    # rather than from the milestones themselves.
     def get_month_number(start, date):
         # First month is month 1; all other months sequentially.
         return 1 + (date.year * 12 + date.month) - (start.year * 12 + start.month)
@@ -101,8 +115,9 @@ def format_gantt(milestones, preamble, postamble, start=datetime(2017, 7, 1)):
     for ms in sorted(milestones, key=lambda x: x.due):
         # A comma in the name causes a problem; escape with \\
         name = ms.short_name.replace(",", "\\,")
+        style = "milestone/.append style={fill=red}," if ms.code in critical else ""
         output_string = (
-            f"\\ganttmilestone[name={get_milestone_name(ms.code)},"
+            f"\\ganttmilestone[name={get_milestone_name(ms.code)},{style}"
             f"progress label text={name}"
             f"\\phantom{{#1}},progress=100]{{{ms.code}}}"
             f"{{{get_month_number(start, ms.due)}}} \\ganttnewline"
@@ -111,12 +126,19 @@ def format_gantt(milestones, preamble, postamble, start=datetime(2017, 7, 1)):
         # format_latex() strips trailing newlines; add one for cosmetic reasons
         output.write("\n")
 
+    graph = dependencies
+    if graph is None:
+        graph = DependencyGraph.from_milestones(milestones)
+    codes = {ms.code for ms in milestones}
     for ms in sorted(milestones, key=lambda x: x.due):
-        for succ in ms.successors:
-            if succ in [milestone.code for milestone in milestones]:
+        for succ in graph.successors(ms.code):
+            if succ in codes:
+                style = ""
+                if ms.code in critical and succ in critical:
+                    style = "[link/.append style={red, thick}]"
                 output.write(
-                    "\\ganttlink{{{}}}{{{}}}\n".format(
-                        get_milestone_name(ms.code), get_milestone_name(succ)
+                    "\\ganttlink{}{{{}}}{{{}}}\n".format(
+                        style, get_milestone_name(ms.code), get_milestone_name(succ)
                     )
                 )
 
@@ -124,37 +146,60 @@ def format_gantt(milestones, preamble, postamble, start=datetime(2017, 7, 1)):
     return output.getvalue()
 
 
-def gantt_standalone(milestones):
+def is_gantt_milestone(ms):
+    return ms.code.startswith(tuple(GANTT_MILESTONES)) and "Milestone" in ms.tasktype
+
+
+def gantt_standalone(milestones, critical=(), dependencies=None):
     milestones = [
         ms
         for ms in milestones
         for gantt in GANTT_MILESTONES
-        if ms.code.startswith(gantt)
+        if ms.code.startswith(gantt) and "Milestone" in ms.tasktype
     ]
     return format_gantt(
         sorted(milestones, key=lambda x: (x.due, x.code)),
         GANTT_PREAMBLE_STANDALONE,
         GANTT_POSTAMBLE_STANDALONE,
+        critical=critical,
+        dependencies=dependencies,
     )
 
 
-def gantt_embedded(milestones):
+def gantt_embedded(milestones, critical=(), dependencies=None):
     milestones = [
         ms
         for ms in milestones
         for gantt in GANTT_MILESTONES
-        if ms.code.startswith(gantt)
+        if ms.code.startswith(gantt) and "Milestone" in ms.tasktype
     ]
     return format_gantt(
         sorted(milestones, key=lambda x: (x.due, x.code)),
         GANTT_PREAMBLE_EMBEDDED,
         GANTT_POSTAMBLE_EMBEDDED,
+        critical=critical,
+        dependencies=dependencies,
     )
 
 
+def gantt_filter(args):
+    # The critical path and the reduced links run through the whole
+    # network, so nothing can be left out when either is to be shown.
+    if args.critical or args.reduce:
+        return None
+    return MilestoneFilter(prefixes=tuple(GANTT_MILESTONES))
+
+
 def gantt(args, milestones):
+    critical = set()
+    if args.critical:
+        require_codes(milestones, [args.critical])
+        critical = set(analyse_schedule(milestones, args.critical).critical_path)
+    dependencies = None
+    if args.reduce:
+        dependencies = reduced_dependencies(milestones, is_gantt_milestone)
     if args.embedded:
-        tex_source = gantt_embedded(milestones)
+        tex_source = gantt_embedded(milestones, critical, dependencies)
     else:
-        tex_source = gantt_standalone(milestones)
-    write_output(args.output, tex_source)
+        tex_source = gantt_standalone(milestones, critical, dependencies)
+    write_output(args.output, tex_source, provenance=get_provenance(args.pmcs_data))
@@ -1,14 +1,18 @@
 import html
 import textwrap
 from datetime import datetime
-from io import StringIO
 
-from .utility import write_output
+import numpy
+
+from .depgraph import DependencyGraph
+from .provenance import get_provenance
+from .schedule import analyse_schedule, reduced_dependencies
+from .utility import open_output, require_codes
 
 __all__ = ["graph"]
 
 
-def format_milestone(ms, my_wbs):
+def format_milestone(ms, my_wbs, critical=False):
     attr_list = [
         "<br/>".join(
             textwrap.wrap(f"label=<{html.escape(ms.code)}: {html.escape(ms.name)}>", 25)
@@ -22,29 +26,90 @@ def format_milestone(ms, my_wbs):
         attr_list.append("fillcolor=orange")
     if not ms.wbs.startswith(my_wbs):
         attr_list.append("shape=rect")
+    if critical:
+        attr_list.append("color=red")
+        attr_list.append("penwidth=2")
     return f"  \"{ms.code}\" [{','.join(attr_list)}];\n"
 
 
+def format_edge(pred, succ, critical):
+    style = " [color=red,penwidth=2]" if pred in critical and succ in critical else ""
+    return f'  "{pred}" -> "{succ}"{style};\n'
+
+
+def dot_lines(milestones, dependencies, focus, my_wbs, within=None, critical=()):
+    # The lines of the dot source showing each milestone in focus (a list of
+    # indices into milestones) with its predecessors and successors. If
+    # within is given, only those milestones are shown. Relations to codes
+    # which are not milestones are ignored. Milestones whose codes are in
+    # critical, and the relations between them, are highlighted.
+    yield "strict digraph {\n"
+    seen = set()
+    for i in focus:
+        if i not in seen:
+            yield format_milestone(
+                milestones[i], my_wbs, milestones[i].code in critical
+            )
+            seen.add(i)
+
+        preds = set(dependencies.predecessor_ids(i).tolist())
+        succs = set(dependencies.successor_ids(i).tolist())
+        for j in dependencies.neighbour_ids(i).tolist():
+            if j >= len(milestones) or (within is not None and j not in within):
+                continue
+            if j not in seen:
+                yield format_milestone(
+                    milestones[j], my_wbs, milestones[j].code in critical
+                )
+                seen.add(j)
+            if j in preds:
+                yield format_edge(milestones[j].code, milestones[i].code, critical)
+            if j in succs:
+                yield format_edge(milestones[i].code, milestones[j].code, critical)
+    yield "}"
+
+
 def graph(args, milestones):
-    dot_source = StringIO()
-    dot_source.write("strict digraph {\n")
-    seen = []
-    for ms in milestones:
-        if not ms.wbs.startswith(args.wbs):
-            continue
-
-        if ms.code not in seen:
-            dot_source.write(format_milestone(ms, args.wbs))
-            seen.append(ms.code)
-
-        for candidate in milestones:
-            if candidate.code in ms.predecessors or candidate.code in ms.successors:
-                if candidate.code not in seen:
-                    dot_source.write(format_milestone(candidate, args.wbs))
-                    seen.append(candidate.code)
-                if candidate.code in ms.predecessors:
-                    dot_source.write(f'  "{candidate.code}" -> "{ms.code}";\n')
-                if candidate.code in ms.successors:
-                    dot_source.write(f'  "{ms.code}" -> "{candidate.code}";\n')
-    dot_source.write("}")
-    write_output(args.output, dot_source.getvalue(), comment_prefix="//")
+    critical = set()
+    if args.critical:
+        # The analysis covers every task loaded, but only milestones are
+        # drawn.
+        require_codes(milestones, [args.critical])
+        critical = set(analyse_schedule(milestones, args.critical).critical_path)
+
+    activities = milestones
+    if args.reduce:
+        # Relations through tasks are collapsed into relations between the
+        # milestones either side of them.
+        dependencies = reduced_dependencies(
+            milestones, lambda ms: "Milestone" in ms.tasktype
+        )
+        milestones = [ms for ms in milestones if "Milestone" in ms.tasktype]
+    else:
+        # Milestones are interned first, so their ids are their indices.
+        milestones = [ms for ms in milestones if "Milestone" in ms.tasktype]
+        dependencies = DependencyGraph.from_milestones(milestones)
+    within = None
+    if args.around:
+        require_codes(milestones, [args.around], "milestone")
+        network, through = dependencies, None
+        if not args.reduce:
+            # The depth counts relations between milestones: passing through
+            # a task, whether loaded or not, does not count.
+            tasks = [ms for ms in activities if "Milestone" not in ms.tasktype]
+            network = DependencyGraph.from_milestones(milestones + tasks)
+            through = numpy.arange(len(network)) >= len(milestones)
+        within = network.neighbourhood_ids(
+            network.ids[args.around], args.depth, through
+        )
+        within = {i for i in within if i < len(milestones)}
+        focus = sorted(within)
+    else:
+        focus = [i for i, ms in enumerate(milestones) if ms.wbs.startswith(args.wbs)]
+
+    with open_output(
+        args.output, comment_prefix="//", provenance=get_provenance(args.pmcs_data)
+    ) as f:
+        f.writelines(
+            dot_lines(milestones, dependencies, focus, args.wbs, within, critical)
+        )
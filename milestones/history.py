@@ -0,0 +1,327 @@
+import hashlib
+import logging
+import os
+import tempfile
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from csv import writer
+from io import StringIO
+
+import numpy
+
+from .cache import content_hash, content_stat, get_cache_dir
+from .excel import (
+    completed_only,
+    load_pmcs_columns,
+    parse_date,
+    resolve_completed,
+    resolve_dates,
+)
+from .options import HISTORY_FIELDS
+from .provenance import get_provenance
+from .utility import find_pmcs_files, write_output
+
+__all__ = ["HistoryStore", "history", "load_history", "read_snapshot"]
+
+
+# Dates are held to the second, as in the extracts; missing values are NaT.
+DATE_DTYPE = "datetime64[s]"
+
+# Marks a milestone which does not appear in a snapshot.
+NO_STATUS = -1
+
+
+def get_history_path(directory):
+    # Each directory of extracts has its own store, so that snapshots of
+    # different data sets never mix.
+    digest = hashlib.blake2b(
+        os.path.abspath(directory).encode(), digest_size=10
+    ).hexdigest()
+    return os.path.join(get_cache_dir(), f"history-{digest}.npz")
+
+
+def read_snapshot(path):
+    # Read the milestone dates and status from a single extract. Runs in a
+    # worker process, so returns plain lists which pickle cheaply.
+    columns = load_pmcs_columns(
+        path,
+        [
+            "task_type",
+            "status_code",
+            "act_end_date",
+            "base_end_date",
+            "start_date",
+            "end_date",
+        ],
+        milestones_only=True,
+    )
+    codes = list(columns)
+    rows = list(columns.values())
+    tasktypes = [row[0] for row in rows]
+    statuses = [row[1] for row in rows]
+    act_end = parse_date.parse_column(
+        completed_only(statuses, [row[2] for row in rows])
+    )
+    base_end, start, end = (
+        parse_date.parse_column([row[i] for row in rows]) for i in (3, 4, 5)
+    )
+
+    result = {field: [] for field in HISTORY_FIELDS}
+    for i, code in enumerate(codes):
+        _, due, fdue = resolve_dates(tasktypes[i], base_end[i], start[i], end[i])
+        result["due"].append(due)
+        result["fdue"].append(fdue)
+        result["completed"].append(
+            resolve_completed(code, statuses[i], act_end[i], base_end[i], start[i])
+        )
+    result["codes"] = codes
+    result["status"] = statuses
+    return result
+
+
+class HistoryStore(object):
+    """Milestone dates across every monthly forecast extract.
+
+    Holds a (milestone x snapshot) matrix for each of ``due``, ``fdue`` and
+    ``completed``, plus the P6 status, with the milestone codes and status
+    strings interned in string tables. Snapshots are identified by their
+    ``YYYYMM`` label and kept in chronological order. The store persists to
+    a single ``.npz`` file per directory of extracts; ``update()`` only
+    parses extracts which are new or have changed since they were last
+    read, and only hashes those whose modification time or size differs.
+    The matrices are allocated with spare capacity, grown geometrically, so
+    adding a snapshot does not copy everything read so far.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshots = []
+        self.hashes = []
+        self.stats = []
+        self.codes = []
+        self.statuses = []
+        self._dates = {
+            field: numpy.empty((0, 0), dtype=DATE_DTYPE) for field in HISTORY_FIELDS
+        }
+        self._status = numpy.empty((0, 0), dtype=numpy.int16)
+        self._ids = {}
+
+    @classmethod
+    def load(cls, path):
+        store = cls(path)
+        if not os.path.exists(store.path):
+            return store
+        with numpy.load(store.path, allow_pickle=False) as data:
+            store.snapshots = data["snapshots"].tolist()
+            store.hashes = data["hashes"].tolist()
+            # Stores written before stats were kept hash every extract once.
+            if "stats" in data.files:
+                store.stats = data["stats"].tolist()
+            else:
+                store.stats = [""] * len(store.snapshots)
+            store.codes = data["codes"].tolist()
+            store.statuses = data["statuses"].tolist()
+            for field in HISTORY_FIELDS:
+                store._dates[field] = data[field]
+            store._status = data["status"]
+        store._ids = {code: i for i, code in enumerate(store.codes)}
+        return store
+
+    @property
+    def dates(self):
+        # Views of the filled part of the matrices, by field.
+        shape = len(self.codes), len(self.snapshots)
+        return {
+            field: dates[: shape[0], : shape[1]] for field, dates in self._dates.items()
+        }
+
+    @property
+    def status(self):
+        return self._status[: len(self.codes), : len(self.snapshots)]
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            numpy.savez_compressed(
+                f,
+                snapshots=numpy.array(self.snapshots, dtype=str),
+                hashes=numpy.array(self.hashes, dtype=str),
+                stats=numpy.array(self.stats, dtype=str),
+                codes=numpy.array(self.codes, dtype=str),
+                statuses=numpy.array(self.statuses, dtype=str),
+                status=self.status,
+                **self.dates,
+            )
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self._ids
+
+    def _intern(self, values, table, ids):
+        result = numpy.empty(len(values), dtype=numpy.int64)
+        for i, value in enumerate(values):
+            if value not in ids:
+                ids[value] = len(table)
+                table.append(value)
+            result[i] = ids[value]
+        return result
+
+    def _reserve(self, rows, cols):
+        # Make room for at least the given numbers of codes and snapshots,
+        # at least doubling the capacity in each direction which is short.
+        capacity = self._status.shape
+        if rows <= capacity[0] and cols <= capacity[1]:
+            return
+        shape = (
+            rows if rows <= capacity[0] else max(rows, 2 * capacity[0]),
+            cols if cols <= capacity[1] else max(cols, 2 * capacity[1]),
+        )
+        used = (slice(0, capacity[0]), slice(0, capacity[1]))
+        for field in HISTORY_FIELDS:
+            dates = numpy.full(shape, numpy.datetime64("NaT"), dtype=DATE_DTYPE)
+            dates[used] = self._dates[field]
+            self._dates[field] = dates
+        status = numpy.full(shape, NO_STATUS, dtype=numpy.int16)
+        status[used] = self._status
+        self._status = status
+
+    def _move_columns(self, source, n):
+        # Make the columns given by source the first n, in that order.
+        for matrix in list(self._dates.values()) + [self._status]:
+            matrix[:, :n] = matrix[:, source]
+
+    def add_snapshot(self, label, file_hash, snapshot, file_stat=""):
+        rows = self._intern(snapshot["codes"], self.codes, self._ids)
+        status_ids = {value: i for i, value in enumerate(self.statuses)}
+        statuses = self._intern(snapshot["status"], self.statuses, status_ids)
+
+        if label in self.snapshots:
+            col = self.snapshots.index(label)
+            self.hashes[col] = file_hash
+            self.stats[col] = file_stat
+            self._reserve(len(self.codes), len(self.snapshots))
+        else:
+            # Usually the latest, so that nothing needs to move.
+            col = bisect_left(self.snapshots, label)
+            n = len(self.snapshots)
+            self._reserve(len(self.codes), n + 1)
+            if col < n:
+                self._move_columns(list(range(col)) + [n] + list(range(col, n)), n + 1)
+            self.snapshots.insert(col, label)
+            self.hashes.insert(col, file_hash)
+            self.stats.insert(col, file_stat)
+
+        for field in HISTORY_FIELDS:
+            self._dates[field][:, col] = numpy.datetime64("NaT")
+            self._dates[field][rows, col] = numpy.array(
+                snapshot[field], dtype=DATE_DTYPE
+            )
+        self._status[:, col] = NO_STATUS
+        self._status[rows, col] = statuses
+
+    def prune(self, labels):
+        # Drop the snapshots which are not among the given labels, e.g.
+        # because their extracts have been removed. Returns the labels
+        # dropped.
+        labels = set(labels)
+        keep = [i for i, label in enumerate(self.snapshots) if label in labels]
+        dropped = [label for label in self.snapshots if label not in labels]
+        if dropped:
+            self._move_columns(keep, len(keep))
+            self.snapshots = [self.snapshots[i] for i in keep]
+            self.hashes = [self.hashes[i] for i in keep]
+            self.stats = [self.stats[i] for i in keep]
+        return dropped
+
+    def update(self, paths, max_workers=None):
+        # Bring the store up to date with the given extracts, reading any
+        # which are new or changed in parallel, and dropping any snapshots
+        # for which there is no longer an extract. An extract is only
+        # hashed if its modification time or size has changed since it was
+        # last seen. Returns the labels read or dropped, and those of the
+        # extracts whose stats changed but content did not, so that the
+        # store is saved whenever it differs.
+        logger = logging.getLogger(__name__)
+        labels = {os.path.basename(path)[:6]: path for path in paths}
+        dropped = self.prune(labels)
+        if dropped:
+            logger.info(f"Dropping {len(dropped)} snapshots from history")
+
+        known = {
+            label: (self.hashes[i], self.stats[i])
+            for i, label in enumerate(self.snapshots)
+        }
+        todo = {}
+        touched = []
+        for label, path in labels.items():
+            file_stat = content_stat(path)
+            known_hash, known_stat = known.get(label, (None, None))
+            if known_stat == file_stat:
+                continue
+            file_hash = content_hash(path)
+            if known_hash == file_hash:
+                self.stats[self.snapshots.index(label)] = file_stat
+                touched.append(label)
+            else:
+                todo[label] = (path, file_hash, file_stat)
+
+        if not todo:
+            return dropped + touched
+
+        logger.info(f"Reading {len(todo)} snapshots into history")
+        labels = sorted(todo)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(read_snapshot, [todo[label][0] for label in labels])
+            for label, snapshot in zip(labels, results):
+                _, file_hash, file_stat = todo[label]
+                self.add_snapshot(label, file_hash, snapshot, file_stat)
+        return dropped + touched + labels
+
+    def series(self, code, field="fdue"):
+        # The given field of one milestone across all snapshots.
+        return self._dates[field][self._ids[code], : len(self.snapshots)]
+
+    def rows(self, codes):
+        return numpy.array([self._ids[code] for code in codes], dtype=numpy.int64)
+
+
+def load_history(pmcs_path, max_workers=None):
+    # The history store, brought up to date with every extract alongside
+    # the given one.
+    directory = os.path.dirname(os.path.abspath(pmcs_path))
+    paths = find_pmcs_files(directory)
+    store = HistoryStore.load(get_history_path(directory))
+    if store.update(paths, max_workers=max_workers):
+        store.save()
+    return store
+
+
+def history(args, milestones):
+    # Slip trend: the forecast date of each selected milestone in every
+    # monthly extract.
+    store = load_history(args.pmcs_data, max_workers=args.jobs)
+
+    prefixes = args.prefix.split()
+    codes = [
+        code
+        for code in store.codes
+        if any(code.startswith(prefix) for prefix in prefixes)
+    ]
+    dates = store.dates[args.field][store.rows(codes)].astype("datetime64[D]")
+
+    output = StringIO()
+    csv_writer = writer(output)
+    csv_writer.writerow(["code"] + store.snapshots)
+    for code, row in zip(codes, dates):
+        csv_writer.writerow([code] + ["" if numpy.isnat(d) else str(d) for d in row])
+    write_output(
+        args.output,
+        output.getvalue(),
+        comment_prefix="#",
+        provenance=get_provenance(args.pmcs_data),
+    )
@@ -1,8 +1,12 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, make_dataclass
 from datetime import datetime
-from typing import Optional, Set
+from typing import Dict, Optional, Set
 
-__all__ = ["Milestone"]
+import numpy
+
+from .depgraph import DependencyGraph
+
+__all__ = ["Milestone", "MilestoneTable", "SlottedMilestone"]
 
 
 @dataclass
@@ -36,7 +40,9 @@ class Milestone(object):
     jira: Optional[str] = None
     jira_testplan: Optional[str] = None
 
-    f2due: Optional[datetime] = None
+    # Forecast (fdue) date in the snapshot the given number of months before
+    # the current one, for each comparison horizon which has been loaded.
+    prior_fdue: Dict[int, datetime] = field(default_factory=dict)
 
     @property
     def short_name(self):
@@ -48,3 +54,172 @@ class Milestone(object):
 
     def __repr__(self):
         return "<Milestone: " + self.code + ">"
+
+
+def add_slots(cls):
+    # A copy of the dataclass cls with __slots__ for its fields, as
+    # dataclass(slots=True) makes on Python 3.10 and later. The defaults are
+    # already part of __init__, so are dropped from the class.
+    names = tuple(f.name for f in fields(cls))
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in names + ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+# Identical to Milestone, but without a per-instance __dict__.
+SlottedMilestone = add_slots(
+    make_dataclass(
+        "SlottedMilestone",
+        [
+            (
+                f.name,
+                f.type,
+                field(default=f.default, default_factory=f.default_factory),
+            )
+            for f in fields(Milestone)
+        ],
+        namespace={
+            "short_name": Milestone.short_name,
+            "__repr__": Milestone.__repr__,
+        },
+    )
+)
+
+
+class MilestoneRow(object):
+    """Read-only view of one row of a MilestoneTable, behaving like a
+    Milestone."""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getattr__(self, name):
+        return self._table.value(name, self._index)
+
+    @property
+    def short_name(self):
+        return self._short_name if self._short_name else self.name
+
+    def __repr__(self):
+        return "<Milestone: " + self.code + ">"
+
+
+class MilestoneTable(object):
+    """Column-oriented store of milestones.
+
+    Dates are held as ``datetime64`` arrays (NaT where missing), the WBS and
+    task type as integer codes into a table of categories, and the relations
+    as a DependencyGraph whose first ``len(table)`` ids are the rows of the
+    table. Columns can be compared as whole arrays, e.g.::
+
+        table.rows((table.due < as_of) & table.incomplete())
+    """
+
+    DATE_FIELDS = ["due", "fdue", "start", "completed"]
+    CATEGORICAL_FIELDS = ["wbs", "tasktype"]
+    RELATION_FIELDS = ["predecessors", "successors"]
+
+    # Recorded as "no level" in the level column.
+    NO_LEVEL = -1
+
+    def __init__(self, milestones):
+        milestones = list(milestones)
+        self._length = len(milestones)
+        self.columns = {}
+        self.categories = {}
+        for f in fields(Milestone):
+            values = [getattr(ms, f.name) for ms in milestones]
+            if f.name in self.DATE_FIELDS:
+                self.columns[f.name] = numpy.array(values, dtype="datetime64[s]")
+            elif f.name in self.CATEGORICAL_FIELDS:
+                categories, codes = numpy.unique(
+                    numpy.array(values, dtype=str), return_inverse=True
+                )
+                self.categories[f.name] = categories.tolist()
+                self.columns[f.name] = codes.astype(numpy.int32)
+            elif f.name == "level":
+                self.columns[f.name] = numpy.array(
+                    [self.NO_LEVEL if v is None else v for v in values],
+                    dtype=numpy.int16,
+                )
+            elif f.name not in self.RELATION_FIELDS:
+                column = numpy.empty(len(values), dtype=object)
+                column[:] = values
+                self.columns[f.name] = column
+        self.graph = DependencyGraph.from_milestones(milestones)
+
+    @classmethod
+    def from_milestones(cls, milestones):
+        return cls(milestones)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if not -self._length <= index < self._length:
+            raise IndexError(index)
+        return MilestoneRow(self, index % self._length)
+
+    def __iter__(self):
+        return (MilestoneRow(self, i) for i in range(self._length))
+
+    def __getattr__(self, name):
+        # Columns are available as attributes; categorical columns as the
+        # category strings.
+        if name in ("columns", "categories"):
+            raise AttributeError(name)
+        if name in self.categories:
+            return numpy.array(self.categories[name], dtype=object)[self.columns[name]]
+        if name in self.columns:
+            return self.columns[name]
+        raise AttributeError(name)
+
+    def value(self, name, index):
+        # Value of a single cell, converted back to its Milestone type.
+        if name in self.RELATION_FIELDS:
+            if name == "predecessors":
+                return set(self.graph.predecessors(self.columns["code"][index]))
+            return set(self.graph.successors(self.columns["code"][index]))
+        if name not in self.columns:
+            raise AttributeError(name)
+        value = self.columns[name][index]
+        if name in self.categories:
+            return self.categories[name][value]
+        if name in self.DATE_FIELDS:
+            return None if numpy.isnat(value) else value.item()
+        if name == "level":
+            return None if value == self.NO_LEVEL else int(value)
+        return value
+
+    def startswith(self, name, prefix):
+        # Boolean mask of rows whose categorical column starts with prefix;
+        # each category is only tested once.
+        matches = numpy.array(
+            [category.startswith(prefix) for category in self.categories[name]],
+            dtype=bool,
+        )
+        return matches[self.columns[name]]
+
+    def incomplete(self):
+        return numpy.isnat(self.columns["completed"])
+
+    def rows(self, mask=None):
+        # Row views, in table order, optionally restricted to a mask.
+        if mask is None:
+            return list(self)
+        return [MilestoneRow(self, i) for i in numpy.flatnonzero(mask)]
+
+    def to_milestones(self, slots=False):
+        cls = SlottedMilestone if slots else Milestone
+        names = [f.name for f in fields(Milestone)]
+        return [
+            cls(**{name: self.value(name, i) for name in names})
+            for i in range(self._length)
+        ]
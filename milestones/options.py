@@ -0,0 +1,24 @@
+# Choices and default paths needed to build the command line parser. This
+# module imports nothing beyond the standard library, so that parsing the
+# arguments (and --help) does not load the data handling stack.
+import os
+
+__all__ = ["GRANULARITIES", "HISTORY_FIELDS", "get_local_data_path", "get_pmcs_dir"]
+
+# Spacing of the points at which a burndown counts the open milestones.
+GRANULARITIES = ["daily", "weekly", "monthly"]
+
+# Dates recorded for each milestone in every snapshot of the history.
+HISTORY_FIELDS = ["due", "fdue", "completed"]
+
+
+def get_pmcs_dir():
+    return os.path.normpath(
+        os.path.join(os.path.dirname(__file__), "..", "data", "pmcs")
+    )
+
+
+def get_local_data_path(path=os.path.dirname(__file__)):
+    return os.path.normpath(
+        os.path.join(os.path.dirname(__file__), "..", "data", "local.yaml")
+    )
@@ -0,0 +1,164 @@
+import logging
+import os
+from datetime import datetime
+
+import yaml
+
+from .cache import SnapshotCache, file_hash
+
+__all__ = ["Overlay", "load_overlay"]
+
+# These are core PMCS attributes; we should warn if we over-write them.
+OVERRIDE_ATTRIBUTES = ["name", "wbs", "level", "predecessors", "successors"]
+
+# A relation is recorded on the activities at both of its ends, so an
+# override of one of these is mirrored in the other on the activity at the
+# far end. The graph and Gantt chart therefore follow an override made on
+# either side of a relation, where before one made on a single side was
+# outweighed by the extract's record on the other.
+RELATION_ATTRIBUTES = {"predecessors": "successors", "successors": "predecessors"}
+
+# Dates given as "YYYY-MM-DD", or "" to clear the PMCS value.
+DATE_ATTRIBUTES = ["due", "completed"]
+
+# Attributes which only come from the local annotations.
+LOCAL_ATTRIBUTES = [
+    "aka",
+    "description",
+    "comment",
+    "short_name",
+    "test_spec",
+    "jira",
+    "jira_testplan",
+    "summarychart",
+]
+
+# Attributes which may change whether a milestone passes a MilestoneFilter.
+FILTER_ATTRIBUTES = ["wbs", "summarychart"]
+
+# Use libyaml when it is available; it is many times faster than the pure
+# Python loader.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Overlays already loaded by this process, by path.
+_loaded = {}
+
+
+def parse_local_date(value):
+    return datetime.strptime(value, "%Y-%m-%d") if value != "" else None
+
+
+class Overlay(object):
+    """Local annotations to be applied on top of the PMCS milestones.
+
+    The annotations are compiled, once, into a dictionary of code to value
+    for each attribute, with dates already parsed, so applying them is a
+    single pass over the milestones.
+    """
+
+    def __init__(self, attributes):
+        self.attributes = attributes
+        # Per code, the (attribute, value) pairs to set, in the order the
+        # attributes are applied.
+        self._by_code = {}
+        for attribute in OVERRIDE_ATTRIBUTES + DATE_ATTRIBUTES + LOCAL_ATTRIBUTES:
+            for code, value in attributes.get(attribute, {}).items():
+                self._by_code.setdefault(code, []).append((attribute, value))
+
+    @classmethod
+    def compile(cls, local):
+        # Build from the parsed contents of local.yaml.
+        attributes = {}
+        for code, values in (local or {}).items():
+            for attribute, value in values.items():
+                if attribute in DATE_ATTRIBUTES:
+                    value = parse_local_date(value)
+                attributes.setdefault(attribute, {})[code] = value
+        return cls(attributes)
+
+    def __contains__(self, code):
+        return code in self._by_code
+
+    def codes(self, attributes=FILTER_ATTRIBUTES):
+        # Codes of milestones for which any of the given attributes is set.
+        return {code for a in attributes for code in self.attributes.get(a, {})}
+
+    def apply(self, milestones):
+        logger = logging.getLogger(__name__)
+        verbose = logger.isEnabledFor(logging.INFO)
+        by_code = {}
+        if any(self.attributes.get(a) for a in RELATION_ATTRIBUTES):
+            by_code = {ms.code: ms for ms in milestones}
+        for ms in milestones:
+            for attribute, value in self._by_code.get(ms.code, ()):
+                if attribute in DATE_ATTRIBUTES:
+                    logger.warning(
+                        f"Overriding PMCS {attribute} on {ms.code} "
+                        f"(was {getattr(ms, attribute)}; "
+                        f"now {value.date() if value else ''})"
+                    )
+                elif verbose and attribute in OVERRIDE_ATTRIBUTES:
+                    logger.info(
+                        f"Overriding PMCS {attribute} on {ms.code} "
+                        f"(was “{getattr(ms, attribute)}”; now “{value}”)"
+                    )
+                elif verbose:
+                    logger.info(f"Setting {attribute} on {ms.code}")
+                if attribute in RELATION_ATTRIBUTES:
+                    value = set(value)
+                    mirror_relations(by_code, ms, attribute, value)
+                # The overlay is shared between loads, so never hand out
+                # its lists.
+                if isinstance(value, list):
+                    value = list(value)
+                setattr(ms, attribute, value)
+        return milestones
+
+
+def mirror_relations(by_code, ms, attribute, value):
+    # Before the given relations of ms are replaced by value, add or remove
+    # ms at the far end of each relation which changes.
+    other = RELATION_ATTRIBUTES[attribute]
+    current = set(getattr(ms, attribute))
+    for code in current - value:
+        if code in by_code:
+            getattr(by_code[code], other).discard(ms.code)
+    for code in value - current:
+        if code in by_code:
+            getattr(by_code[code], other).add(ms.code)
+
+
+def load_overlay(path, use_cache=True, cache=None):
+    # Load local.yaml as an Overlay. Unless the file has changed since it
+    # was last seen (going by its modification time, then its content), the
+    # compiled overlay is reused from this process or the snapshot cache.
+    logger = logging.getLogger(__name__)
+    stat = os.stat(path)
+    mtime = (stat.st_mtime_ns, stat.st_size)
+    path = os.path.abspath(path)
+
+    if use_cache and path in _loaded and _loaded[path][0] == mtime:
+        return _loaded[path][2]
+
+    digest = file_hash([path])
+    if use_cache and path in _loaded and _loaded[path][1] == digest:
+        _loaded[path] = (mtime,) + _loaded[path][1:]
+        return _loaded[path][2]
+
+    cache = cache or SnapshotCache()
+    key = cache.hash_key(digest, "overlay")
+    attributes = cache.get(key) if use_cache else None
+    if attributes is not None:
+        logger.info(f"Loaded {path} from cache")
+        overlay = Overlay(attributes)
+    else:
+        with open(path) as f:
+            overlay = Overlay.compile(yaml.load(f, Loader=YamlLoader))
+        if use_cache:
+            try:
+                cache.put(key, overlay.attributes)
+            except OSError as e:
+                logger.warning(f"Unable to cache {path}: {e}")
+
+    _loaded[path] = (mtime, digest, overlay)
+    return overlay
@@ -0,0 +1,52 @@
+from abc import ABC, abstractmethod
+
+__all__ = ["PMCSReader"]
+
+TASK_SHEET_NAME = "TASK"
+RELATION_SHEET_NAME = "TASKPRED"
+
+
+class PMCSReader(ABC):
+    """Access to the TASK and TASKPRED tables of a PMCS extract.
+
+    Tables are addressed by their sheet name. The first row of each holds
+    the P6 field names and the second a description of each field; both are
+    skipped when reading values. Fields which are absent from an extract
+    read as empty strings.
+    """
+
+    # Whether rows are produced one at a time from the file, rather than
+    # from a copy of the whole table held in memory.
+    streaming = True
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def source_files(path):
+        # All files making up the extract at path.
+        return [path]
+
+    @abstractmethod
+    def rows(self, table, fields):
+        # Iterate over the rows of a table as tuples of the given fields.
+        raise NotImplementedError
+
+    def columns(self, table, fields):
+        # The given fields of a table as a list of columns.
+        columns = [list(column) for column in zip(*self.rows(table, fields))]
+        return columns or [[] for field in fields]
+
+    @staticmethod
+    def _positions(header, fields):
+        header = {name: position for position, name in enumerate(header)}
+        return [header.get(field) for field in fields]
@@ -1,16 +1,20 @@
+from .depgraph import DependencyGraph
+
 __all__ = ["predecessors"]
 
 
 def predecessors(args, milestones):
+    graph = DependencyGraph.from_milestones(milestones)
+    by_code = {ms.code: ms for ms in milestones}
     for ms in sorted(
         (ms for ms in milestones if ms.code.startswith("LDM-503")),
         key=lambda x: (x.due, x.code),
     ):
         print(f"{ms.code} ({ms.name}) :")
         predecessors = [
-            prems
-            for prems in milestones
-            if prems.code in ms.predecessors and prems.code.startswith("DM-")
+            by_code[code]
+            for code in graph.predecessors(ms.code)
+            if code in by_code and code.startswith("DM-")
         ]
         if not predecessors:
             print("    (No prdecessors)")
@@ -0,0 +1,355 @@
+import logging
+import mmap
+import os
+import struct
+import subprocess
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+__all__ = ["Provenance", "get_provenance"]
+
+# The keys savefig() accepts for the subject and keywords of a document, by
+# output format.
+METADATA_KEYS = {
+    "pdf": ("Subject", "Keywords"),
+    "png": ("Subject", "Keywords"),
+    "svg": ("Description", "Keywords"),
+    "svgz": ("Description", "Keywords"),
+}
+
+
+@dataclass(frozen=True)
+class Provenance(object):
+    """Where a set of outputs came from.
+
+    ``sha`` and ``timestamp`` identify (and date) the commit of the
+    repository holding the PMCS extract; both are None if it is not under
+    version control. ``p6_date`` is the month of the extract.
+    """
+
+    pmcs_path: str
+    sha: Optional[str]
+    timestamp: Optional[datetime]
+    p6_date: datetime
+
+    def __str__(self):
+        source = f"{self.p6_date.strftime('%B %Y')} project controls data"
+        if self.sha:
+            source += (
+                f", lsst-dm/milestones {self.sha[:8]} "
+                f"dated {self.timestamp.strftime('%Y-%m-%d')}"
+            )
+        return source
+
+    def as_tuple(self):
+        # As returned by get_version_info().
+        return self.sha, self.timestamp, self.p6_date
+
+    def metadata(self, filename):
+        # Document metadata for Matplotlib's savefig() when writing filename,
+        # using the keys its format understands; None for the formats (such
+        # as JPEG) which take no metadata.
+        extension = os.path.splitext(filename)[1][1:].lower() or "png"
+        keys = METADATA_KEYS.get(extension)
+        if keys is None:
+            return None
+        subject, keywords = keys
+        metadata = {subject: str(self)}
+        if self.sha:
+            metadata[keywords] = self.sha
+        return metadata
+
+
+def find_git_dir(path):
+    # The git directory of the repository containing path, or None.
+    path = os.path.abspath(path)
+    while True:
+        candidate = os.path.join(path, ".git")
+        if os.path.isdir(candidate):
+            return candidate
+        if os.path.isfile(candidate):
+            # Worktrees and submodules: ".git" holds "gitdir: <path>".
+            with open(candidate) as f:
+                content = f.read().strip()
+            if content.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(path, content[7:].strip()))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def get_common_dir(git_dir):
+    # Worktrees keep their own HEAD, but share refs and objects with the
+    # main repository.
+    filename = os.path.join(git_dir, "commondir")
+    if not os.path.exists(filename):
+        return git_dir
+    with open(filename) as f:
+        return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+
+
+def read_ref(git_dir, ref):
+    # Resolve a symbolic or direct reference to a commit sha.
+    common_dir = get_common_dir(git_dir)
+    for _ in range(10):
+        if not ref.startswith("ref:"):
+            return ref
+        name = ref[4:].strip()
+        for directory in (git_dir, common_dir):
+            filename = os.path.join(directory, name)
+            if os.path.isfile(filename):
+                with open(filename) as f:
+                    ref = f.read().strip()
+                break
+        else:
+            return read_packed_ref(common_dir, name)
+    return None
+
+
+def read_packed_ref(git_dir, name):
+    try:
+        with open(os.path.join(git_dir, "packed-refs")) as f:
+            for line in f:
+                if not line.startswith(("#", "^")):
+                    sha, ref_name = line.split()
+                    if ref_name == name:
+                        return sha
+    except FileNotFoundError:
+        pass
+    return None
+
+
+# Types of the objects in a pack, and the two kinds of delta against
+# another object.
+PACK_TYPES = {1: b"commit", 2: b"tree", 3: b"blob", 4: b"tag"}
+OFS_DELTA, REF_DELTA = 6, 7
+
+
+def read_loose_object(objects_dir, sha):
+    # (type, content) of a loose object, or None if it is not loose.
+    filename = os.path.join(objects_dir, sha[:2], sha[2:])
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "rb") as f:
+        data = zlib.decompress(f.read())
+    header, _, body = data.partition(b"\0")
+    return header.split(b" ")[0], body
+
+
+def find_in_index(index, sha):
+    # Offset within its pack of the object with the given sha, from the
+    # contents of a version 2 pack index, or None if it is not there.
+    if index[:8] != b"\377tOc\0\0\0\2":
+        raise ValueError("Unsupported pack index version")
+    key = bytes.fromhex(sha)
+    fanout = struct.unpack_from(">256I", index, 8)
+    count = fanout[255]
+    low, high = fanout[key[0] - 1] if key[0] else 0, fanout[key[0]]
+    names = 8 + 256 * 4
+    while low < high:
+        middle = (low + high) // 2
+        name = index[names + 20 * middle : names + 20 * middle + 20]
+        if name < key:
+            low = middle + 1
+        elif name > key:
+            high = middle
+        else:
+            offsets = names + 24 * count
+            (offset,) = struct.unpack_from(">I", index, offsets + 4 * middle)
+            if offset & 0x80000000:
+                large = offsets + 4 * count + 8 * (offset & 0x7FFFFFFF)
+                (offset,) = struct.unpack_from(">Q", index, large)
+            return offset
+    return None
+
+
+def apply_delta(base, delta):
+    # Rebuild an object from its base and a delta of copy and insert
+    # instructions.
+    def varint(position):
+        value = shift = 0
+        while True:
+            byte = delta[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, position
+
+    _, position = varint(0)
+    size, position = varint(position)
+    result = bytearray()
+    while position < len(delta):
+        command = delta[position]
+        position += 1
+        if command & 0x80:
+            values = []
+            for bits in (4, 3):
+                value = 0
+                for i in range(bits):
+                    if command & (1 << i):
+                        value |= delta[position] << (8 * i)
+                        position += 1
+                values.append(value)
+                command >>= 4
+            offset, length = values
+            result += base[offset : offset + (length or 0x10000)]
+        elif command:
+            result += delta[position : position + command]
+            position += command
+        else:
+            raise ValueError("Invalid delta instruction")
+    if len(result) != size:
+        raise ValueError("Delta produced an object of the wrong size")
+    return bytes(result)
+
+
+def inflate(pack, offset, chunk_size=65536):
+    # The zlib stream starting at the given offset of a pack, which is read
+    # only as far as the stream's end.
+    decompressor = zlib.decompressobj()
+    result = []
+    while not decompressor.eof:
+        chunk = pack[offset : offset + chunk_size]
+        if not chunk:
+            raise ValueError("Truncated pack")
+        result.append(decompressor.decompress(chunk))
+        offset += chunk_size
+    return b"".join(result)
+
+
+def read_pack_entry(pack, offset, objects_dir):
+    # (type, content) of the object at the given offset of a pack, with any
+    # chain of deltas resolved.
+    start = offset
+    byte = pack[offset]
+    kind = (byte >> 4) & 7
+    offset += 1
+    while byte & 0x80:
+        byte = pack[offset]
+        offset += 1
+    if kind == OFS_DELTA:
+        byte = pack[offset]
+        distance = byte & 0x7F
+        offset += 1
+        while byte & 0x80:
+            byte = pack[offset]
+            offset += 1
+            distance = ((distance + 1) << 7) | (byte & 0x7F)
+        base_offset = start - distance
+    elif kind == REF_DELTA:
+        base_sha = pack[offset : offset + 20].hex()
+        offset += 20
+    content = inflate(pack, offset)
+    if kind in PACK_TYPES:
+        return PACK_TYPES[kind], content
+    if kind == OFS_DELTA:
+        base = read_pack_entry(pack, base_offset, objects_dir)
+    elif kind == REF_DELTA:
+        base = read_object(objects_dir, base_sha)
+    else:
+        raise ValueError(f"Unknown pack object type {kind}")
+    if base is None:
+        return None
+    return base[0], apply_delta(base[1], content)
+
+
+def read_packed_object(objects_dir, sha):
+    # (type, content) of an object in one of the packs, or None.
+    pack_dir = os.path.join(objects_dir, "pack")
+    if not os.path.isdir(pack_dir):
+        return None
+    for name in sorted(os.listdir(pack_dir)):
+        if not name.endswith(".idx"):
+            continue
+        with open(os.path.join(pack_dir, name), "rb") as f:
+            offset = find_in_index(f.read(), sha)
+        if offset is not None:
+            with open(os.path.join(pack_dir, name[:-4] + ".pack"), "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pack:
+                    return read_pack_entry(pack, offset, objects_dir)
+    return None
+
+
+def read_object(objects_dir, sha):
+    # (type, content) of an object, loose or packed, or None if it is not
+    # found (for example, in an alternate object store).
+    return read_loose_object(objects_dir, sha) or read_packed_object(objects_dir, sha)
+
+
+def read_author_date(git_dir, sha):
+    # Author date of a commit, read from the object store.
+    obj = read_object(os.path.join(git_dir, "objects"), sha)
+    if obj is None or obj[0] != b"commit":
+        return None
+    for line in obj[1].split(b"\n"):
+        if not line:
+            break
+        if line.startswith(b"author "):
+            # "author Name <email> 1646092800 +0000"
+            return int(line.rsplit(b" ", 2)[1])
+    return None
+
+
+def read_head(directory):
+    # (sha, unix timestamp) of HEAD of the repository containing directory,
+    # read directly from .git, or None if that is not possible.
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        return None
+    with open(os.path.join(git_dir, "HEAD")) as f:
+        sha = read_ref(git_dir, f.read().strip())
+    if not sha:
+        return None
+    date = read_author_date(get_common_dir(git_dir), sha)
+    if date is None:
+        return None
+    return sha, date
+
+
+def run_git_log(directory):
+    sha, date = (
+        subprocess.check_output(
+            ["git", "log", "-1", "--pretty=format:'%H %ad'", "--date=unix"],
+            cwd=directory,
+            stderr=subprocess.DEVNULL,
+        )
+        .decode("utf-8")
+        .strip("'")
+        .split()
+    )
+    return sha, int(date)
+
+
+@lru_cache(maxsize=None)
+def _get_provenance(pmcs_path):
+    logger = logging.getLogger(__name__)
+    directory = os.path.dirname(pmcs_path)
+    try:
+        head = read_head(directory)
+    except (OSError, ValueError, zlib.error) as e:
+        logger.debug(f"Unable to read git metadata directly ({e})")
+        head = None
+    if head is None:
+        try:
+            head = run_git_log(directory)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Unable to determine version of {pmcs_path}: {e}")
+
+    sha, timestamp = None, None
+    if head is not None:
+        sha, timestamp = head[0], datetime.utcfromtimestamp(head[1])
+
+    split = os.path.basename(pmcs_path).split("-")
+    p6_date = datetime.strptime(split[0], "%Y%m")
+    return Provenance(pmcs_path, sha, timestamp, p6_date)
+
+
+def get_provenance(pmcs_path):
+    # Provenance of the given PMCS extract. Git is consulted once per
+    # extract for the lifetime of the process.
+    return _get_provenance(os.path.abspath(pmcs_path))
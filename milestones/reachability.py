@@ -0,0 +1,122 @@
+import logging
+
+from .cache import SnapshotCache, content_hash, file_hash
+from .depgraph import DependencyGraph
+from .schedule import iter_bits, reachable_bitsets
+from .utility import load_milestones
+
+__all__ = ["ReachabilityIndex", "impact", "load_reachability"]
+
+
+def is_milestone(ms):
+    return "Milestone" in ms.tasktype
+
+
+class ReachabilityIndex(object):
+    """Transitive closure of the relations between milestones.
+
+    Each milestone's ancestors and descendants are held as bitsets (Python
+    ints) over the milestones, following relations through any tasks in
+    between, so testing whether one milestone is downstream of another is a
+    single bit test and listing them costs time in proportion to the answer.
+    """
+
+    def __init__(self, codes, descendants, ancestors):
+        self.codes = list(codes)
+        self.ids = {code: i for i, code in enumerate(self.codes)}
+        self._descendants = descendants
+        self._ancestors = ancestors
+
+    @classmethod
+    def from_graph(cls, graph, keep=None):
+        # Index the activities of graph for which keep (a boolean mask) is
+        # true; all of them if keep is None.
+        kept, descendants, _, _ = reachable_bitsets(graph, keep)
+        _, ancestors, _, _ = reachable_bitsets(graph.reversed(), keep)
+        return cls(
+            [graph.codes[i] for i in kept],
+            [descendants[i] for i in kept],
+            [ancestors[i] for i in kept],
+        )
+
+    @classmethod
+    def from_milestones(cls, milestones):
+        graph = DependencyGraph.from_milestones(milestones).subgraph(len(milestones))
+        return cls.from_graph(graph, [is_milestone(ms) for ms in milestones])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.ids
+
+    def reaches(self, code, other):
+        # True if other is downstream of code.
+        return bool(self._descendants[self.ids[code]] >> self.ids[other] & 1)
+
+    def descendants(self, code):
+        return [self.codes[b] for b in iter_bits(self._descendants[self.ids[code]])]
+
+    def ancestors(self, code):
+        return [self.codes[b] for b in iter_bits(self._ancestors[self.ids[code]])]
+
+    def affected(self, codes, prefixes=()):
+        # Milestones downstream of any of codes (e.g. which would be
+        # affected if they slipped), optionally only those whose codes start
+        # with one of prefixes.
+        bits = 0
+        for code in codes:
+            bits |= self._descendants[self.ids[code]]
+        affected = (self.codes[b] for b in iter_bits(bits))
+        return [code for code in affected if code.startswith(tuple(prefixes))]
+
+    def state(self):
+        return self.codes, self._descendants, self._ancestors
+
+
+def load_reachability(pmcs_path, local_data_path, use_cache=True, cache=None):
+    # The ReachabilityIndex of the milestones in a snapshot, with the local
+    # annotations applied. It is built once per snapshot and annotation
+    # file, and otherwise loaded from the snapshot cache without reading
+    # the tasks at all.
+    logger = logging.getLogger(__name__)
+    cache = cache or SnapshotCache()
+    key = cache.hash_key(
+        content_hash(pmcs_path), file_hash([local_data_path]), "reachability"
+    )
+    state = cache.get(key) if use_cache else None
+    if state is not None:
+        logger.info(f"Loaded reachability of {pmcs_path} from cache")
+        return ReachabilityIndex(*state)
+
+    milestones = load_milestones(
+        pmcs_path, local_data_path, load_tasks=True, use_cache=use_cache
+    )
+    index = ReachabilityIndex.from_milestones(milestones)
+    if use_cache:
+        try:
+            cache.put(key, index.state())
+        except OSError as e:
+            logger.warning(f"Unable to cache reachability of {pmcs_path}: {e}")
+    return index
+
+
+def impact(args, milestones):
+    index = load_reachability(
+        args.pmcs_data, args.local_data, use_cache=not args.no_cache
+    )
+    by_code = {ms.code: ms for ms in milestones}
+    for code in args.codes:
+        if code not in index:
+            print(f"{code}: not a milestone")
+            continue
+        print(f"{code} ({by_code[code].name}) :")
+        affected = [
+            by_code[c]
+            for c in index.affected([code], args.prefix.split())
+            if c in by_code
+        ]
+        if not affected:
+            print("    (No downstream milestones)")
+        for ms in sorted(affected, key=lambda x: (x.fdue or x.due, x.code)):
+            print(f"    {ms.code} ({ms.name}) {(ms.fdue or ms.due).date()}")
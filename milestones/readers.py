@@ -0,0 +1,140 @@
+import csv
+import os
+import sys
+
+import xlrd
+
+from .pmcsreader import RELATION_SHEET_NAME, TASK_SHEET_NAME, PMCSReader
+from .xer import XerReader
+
+__all__ = ["CsvReader", "XlsReader", "XlsxReader", "open_pmcs"]
+
+# Skip the first two rows, which always contain header information.
+START_ROW = 2
+
+
+class ColumnFetcher(object):
+    def __init__(self, sheet):
+        self._sheet = sheet
+        self._positions = {
+            field_name: position
+            for position, field_name in enumerate(sheet.row_values(0))
+        }
+
+    def __contains__(self, field_name):
+        return field_name in self._positions
+
+    def __call__(self, field_name, default=""):
+        # Columns which are absent from older extracts read as empty.
+        if field_name not in self._positions:
+            return [default] * max(self._sheet.nrows - START_ROW, 0)
+        return self._sheet.col_values(self._positions[field_name], START_ROW)
+
+
+class XlsReader(PMCSReader):
+    """Legacy Excel (BIFF) workbooks, as exported by P6.
+
+    xlrd always parses whole sheets, so columns are the cheapest way to
+    access the data; sheets are loaded on first use.
+    """
+
+    streaming = False
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._workbook = xlrd.open_workbook(path, logfile=sys.stderr, on_demand=True)
+
+    def close(self):
+        self._workbook.release_resources()
+
+    def columns(self, table, fields):
+        fetcher = ColumnFetcher(self._workbook.sheet_by_name(table))
+        return [fetcher(field) for field in fields]
+
+    def rows(self, table, fields):
+        return zip(*self.columns(table, fields))
+
+
+class XlsxReader(PMCSReader):
+    """Office Open XML workbooks, streamed row by row.
+
+    Requires openpyxl, which is only imported when such a file is read.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            import openpyxl
+        except ImportError as e:
+            raise ImportError(f"openpyxl is required to read {path}") from e
+        self._workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    def close(self):
+        self._workbook.close()
+
+    def rows(self, table, fields):
+        values = self._workbook[table].iter_rows(values_only=True)
+        positions = self._positions(next(values, ()), fields)
+        next(values, None)
+        for row in values:
+            yield tuple(
+                "" if p is None or p >= len(row) or row[p] is None else row[p]
+                for p in positions
+            )
+
+
+class CsvReader(PMCSReader):
+    """CSV exports of the TASK and TASKPRED sheets, streamed row by row.
+
+    The TASK table is read from the given path, e.g. ``YYYYMM-ME.csv``, and
+    TASKPRED from the file alongside it with the table name appended, e.g.
+    ``YYYYMM-ME-TASKPRED.csv``.
+    """
+
+    @staticmethod
+    def table_path(path, table):
+        if table == TASK_SHEET_NAME:
+            return path
+        stem, ext = os.path.splitext(path)
+        return f"{stem}-{table}{ext}"
+
+    @classmethod
+    def source_files(cls, path):
+        return [
+            cls.table_path(path, table)
+            for table in (TASK_SHEET_NAME, RELATION_SHEET_NAME)
+        ]
+
+    def rows(self, table, fields):
+        with open(self.table_path(self.path, table), newline="") as f:
+            values = csv.reader(f)
+            positions = self._positions(next(values, ()), fields)
+            next(values, None)
+            for row in values:
+                yield tuple(
+                    "" if p is None or p >= len(row) else row[p] for p in positions
+                )
+
+
+READERS = {
+    ".xls": XlsReader,
+    ".xlsx": XlsxReader,
+    ".csv": CsvReader,
+    ".xer": XerReader,
+}
+
+
+def get_reader_class(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"No reader for PMCS extract {path}")
+    return READERS[ext]
+
+
+def open_pmcs(path):
+    # Open a PMCS extract with the reader for its file extension.
+    return get_reader_class(path)(path)
+
+
+def get_source_files(path):
+    return get_reader_class(path).source_files(path)
@@ -1,4 +1,10 @@
-__all__ = ["remaining"]
+from .filters import MilestoneFilter
+
+__all__ = ["remaining", "remaining_filter"]
+
+
+def remaining_filter(args):
+    return MilestoneFilter(wbs=args.wbs)
 
 
 def remaining(args, milestones):
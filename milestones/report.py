@@ -1,50 +1,44 @@
-from .excel import load_pmcs_excel
-from .utility import get_pmcs_path_months
+from .filters import MilestoneFilter
 
-__all__ = ["report"]
+__all__ = ["report", "report_filter"]
+
+
+def report_filter(args):
+    return MilestoneFilter(prefixes=tuple(args.prefix.split()))
 
 
 def report(args, milestones):
-    # Build a report with filtered milestones including last months due date
-    # and n months prior due date
+    # Build a report with filtered milestones including the forecast due date
+    # from each of the requested number of months prior
     start_date = args.start_date
     prefixes = args.prefix.split()
     out = open(args.output, "w")
 
     print(
-        f"Report for milestones starting with {prefixes} using last "
-        f"{args.months} month prior forecast"
+        f"Report for milestones starting with {prefixes} using "
+        f"{args.horizons} month prior forecasts"
     )
 
-    # The milestones will have loaded the 2 month already we need to get the 1 month
-    fpath = get_pmcs_path_months(args.pmcs_data, 1)
-    milestonesLastMonth = load_pmcs_excel(fpath, False)
     milestones = [
         ms
         for ms in milestones
-        for prefix in prefixes
-        if ms.code.startswith(prefix)
+        if ms.code.startswith(tuple(prefixes))
         and (ms.due and ms.due > start_date)
         and (not ms.completed or ms.completed > start_date)
     ]
 
-    codes = [ms.code for ms in milestones]
-    lmmap = {}
-    for mslm in milestonesLastMonth:
-        if mslm.code in codes:
-            lmmap[mslm.code] = mslm.fdue
-
-    print("Code, Forecast end, Last Month, delta1 ,  2 Month, delta2", file=out)
+    header = "Code, Forecast end"
+    for horizon in args.horizons:
+        label = "Last Month" if horizon == 1 else f"{horizon} Month"
+        header += f", {label}, delta{horizon}"
+    print(header, file=out)
     for ms in milestones:
-        if ms.code in lmmap:
-            lmdue = lmmap[ms.code]
-        if lmdue is None:  # may be new with no prior
-            lmdue = ms.fdue
-        print(
-            f"{ms.code},{ms.name},"
-            f"{ms.fdue.date()},{lmdue.date()},{(ms.fdue-lmdue).days},"
-            f"{ms.f2due.date()},{(ms.fdue-ms.f2due).days}",
-            file=out,
-        )
+        row = f"{ms.code},{ms.name},{ms.fdue.date()}"
+        for horizon in args.horizons:
+            # may be new with no prior; compared with its baseline, as in
+            # the burndown
+            prior = ms.prior_fdue.get(horizon, ms.due)
+            row += f",{prior.date()},{(ms.fdue-prior).days}"
+        print(row, file=out)
 
     out.close()
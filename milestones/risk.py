@@ -0,0 +1,185 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from csv import writer
+from dataclasses import dataclass
+from io import StringIO
+from typing import List
+
+import numpy
+
+from .history import load_history
+from .milestone import MilestoneTable
+from .provenance import get_provenance
+from .schedule import Network, to_date
+from .utility import write_output
+
+__all__ = ["RiskResult", "fit_slips", "load_slips", "risk", "simulate"]
+
+# Relative slip (as a fraction of the time remaining) assumed when there is
+# no history to fit: a triangular distribution with this minimum, mode and
+# maximum.
+DEFAULT_SLIP = (-0.1, 0.0, 0.5)
+
+# Only forecasts at least this far ahead are used to fit slips; the
+# relative error of a forecast for next week is mostly noise.
+MIN_HORIZON = numpy.timedelta64(30, "D")
+
+# Trials run together in one array; bounds the memory used per process to
+# about (activities x CHUNK_TRIALS x 16) bytes.
+CHUNK_TRIALS = 250
+
+PERCENTILES = [50, 80, 95]
+
+
+def fit_slips(store, until=None):
+    # Relative forecast errors observed in a HistoryStore, for sampling by
+    # simulate(). For every milestone which has been completed, and every
+    # snapshot (up to the one labelled until) in which it was still open,
+    # the error is (completed - fdue) / (fdue - snapshot date).
+    columns = [
+        i for i, label in enumerate(store.snapshots) if not until or label <= until
+    ]
+    if not columns:
+        return numpy.array([])
+    labels = [store.snapshots[i] for i in columns]
+    snapshot_dates = numpy.array(
+        [f"{label[:4]}-{label[4:6]}-01" for label in labels], dtype="datetime64[s]"
+    )
+    fdue = store.dates["fdue"][:, columns]
+    open_then = numpy.isnat(store.dates["completed"][:, columns])
+    completed = store.dates["completed"][:, columns[-1]][:, None]
+
+    horizon = fdue - snapshot_dates[None, :]
+    valid = (
+        open_then
+        & ~numpy.isnat(fdue)
+        & ~numpy.isnat(completed)
+        & (horizon >= MIN_HORIZON)
+    )
+    error = (completed - fdue)[valid] / horizon[valid]
+    return numpy.clip(error.astype(numpy.float64), -1, None)
+
+
+def simulate_chunk(network, rows, slips, trials, seed):
+    # Finish dates of the given rows of the network in each of a number of
+    # trials. Every incomplete activity's duration is stretched by a slip
+    # drawn independently for each trial, and the delay passed on to its
+    # successors; activities never start before their scheduled start.
+    rng = numpy.random.default_rng(seed)
+    shape = (len(network), trials)
+    if len(slips):
+        slip = rng.choice(slips, size=shape)
+    else:
+        slip = rng.triangular(*DEFAULT_SLIP, size=shape)
+    duration = network.duration[:, None] * (1 + slip)
+    _, early_finish = network.forward_pass(duration, anchored=True)
+    return early_finish[rows]
+
+
+@dataclass
+class RiskResult(object):
+    """Simulated finish dates of a set of activities.
+
+    ``finish`` holds days since the epoch, one row per code and one column
+    per trial; ``forecast`` the deterministic finish of each code.
+    """
+
+    codes: List[str]
+    finish: numpy.ndarray
+    forecast: numpy.ndarray
+
+    def percentiles(self, q=PERCENTILES):
+        # Dictionary of code to the finish date at each of the percentiles.
+        values = numpy.percentile(self.finish, q, axis=1).T
+        return {
+            code: [to_date(day) for day in row] for code, row in zip(self.codes, values)
+        }
+
+    def dates(self):
+        # The simulated finish dates as datetime64 values; NaT if unknown.
+        dates = numpy.full(self.finish.shape, numpy.datetime64("NaT", "D"))
+        known = numpy.isfinite(self.finish)
+        dates[known] = self.finish[known].astype(numpy.int64)
+        return dates
+
+
+def simulate(milestones, codes, trials=1000, slips=(), seed=0, max_workers=None):
+    # Monte Carlo simulation of the finish dates of the given codes through
+    # the network of the given activities. slips are the relative slips to
+    # sample from (see fit_slips()); if empty, DEFAULT_SLIP is used. Batches
+    # of trials are run in parallel when there are several.
+    table = MilestoneTable(milestones)
+    network = Network(table)
+    rows = numpy.array([network.graph.ids[code] for code in codes], dtype=numpy.int64)
+    slips = numpy.asarray(slips, dtype=numpy.float64)
+
+    sizes = [CHUNK_TRIALS] * (trials // CHUNK_TRIALS)
+    if trials % CHUNK_TRIALS:
+        sizes.append(trials % CHUNK_TRIALS)
+    seeds = numpy.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(network, rows, slips, size, seed) for size, seed in zip(sizes, seeds)]
+    if len(sizes) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunks = list(executor.map(simulate_chunk, *zip(*args)))
+    else:
+        chunks = [simulate_chunk(*arg) for arg in args]
+
+    _, forecast = network.forward_pass(anchored=True)
+    return RiskResult(
+        codes=list(codes),
+        finish=numpy.concatenate(chunks, axis=1),
+        forecast=forecast[rows],
+    )
+
+
+def load_slips(pmcs_path, max_workers=None):
+    # Slips fitted from the history of the extracts alongside pmcs_path,
+    # up to and including it.
+    logger = logging.getLogger(__name__)
+    store = load_history(pmcs_path, max_workers=max_workers)
+    slips = fit_slips(store, until=os.path.basename(pmcs_path)[:6])
+    if len(slips):
+        logger.info(f"Fitted {len(slips)} slips from {len(store.snapshots)} snapshots")
+    else:
+        logger.warning(f"No slips in the history; using a default of {DEFAULT_SLIP}")
+    return slips
+
+
+def risk(args, milestones):
+    prefixes = tuple(args.prefix.split())
+    codes = [
+        ms.code
+        for ms in milestones
+        if ms.code.startswith(prefixes)
+        and "Milestone" in ms.tasktype
+        and not ms.completed
+    ]
+    slips = () if args.no_history else load_slips(args.pmcs_data, args.jobs)
+    result = simulate(
+        milestones,
+        codes,
+        trials=args.trials,
+        slips=slips,
+        seed=args.seed,
+        max_workers=args.jobs,
+    )
+
+    by_code = {ms.code: ms for ms in milestones}
+    percentiles = result.percentiles()
+    output = StringIO()
+    csv_writer = writer(output)
+    csv_writer.writerow(["code", "name", "fdue"] + [f"P{q}" for q in PERCENTILES])
+    for ms in sorted(
+        (by_code[code] for code in codes), key=lambda x: (x.fdue or x.due, x.code)
+    ):
+        csv_writer.writerow(
+            [ms.code, ms.name, ms.fdue.date() if ms.fdue else ""]
+            + [date or "" for date in percentiles[ms.code]]
+        )
+    write_output(
+        args.output,
+        output.getvalue(),
+        comment_prefix="#",
+        provenance=get_provenance(args.pmcs_data),
+    )
@@ -0,0 +1,400 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy
+
+from .depgraph import DependencyGraph
+from .milestone import MilestoneTable
+from .utility import require_codes
+
+__all__ = [
+    "Network",
+    "ScheduleAnalysis",
+    "analyse_schedule",
+    "critical",
+    "topological_levels",
+    "reduced_dependencies",
+    "transitive_reduction",
+]
+
+
+def to_date(days):
+    # A date held as days since the epoch, or None if it is not known.
+    return None if not numpy.isfinite(days) else numpy.datetime64(int(days), "D")
+
+
+def find_cycle(graph, remaining):
+    # A cycle among the ids in remaining, each of which has at least one
+    # predecessor also in remaining, as a list of codes.
+    remaining = set(remaining.tolist())
+    i = min(remaining)
+    path, position = [], {}
+    while i not in position:
+        position[i] = len(path)
+        path.append(i)
+        i = next(int(j) for j in graph.predecessor_ids(i) if j in remaining)
+    cycle = path[position[i] :][::-1]
+    return [graph.codes[j] for j in cycle + cycle[:1]]
+
+
+def topological_levels(graph):
+    # The level of each activity in the network: 0 if it has no
+    # predecessors, otherwise one more than the highest level of its
+    # predecessors. Every relation therefore runs from a lower to a higher
+    # level. Raises ValueError if the relations contain a cycle.
+    n = len(graph)
+    indegree = numpy.bincount(graph.succ_ids, minlength=n)
+    levels = numpy.full(n, -1, dtype=numpy.int64)
+    frontier = numpy.flatnonzero(indegree == 0)
+    level = 0
+    while len(frontier):
+        levels[frontier] = level
+        successors = graph.successor_ids_of(frontier)
+        numpy.subtract.at(indegree, successors, 1)
+        frontier = numpy.unique(successors[indegree[successors] == 0])
+        level += 1
+    if (levels < 0).any():
+        cycle = find_cycle(graph, numpy.flatnonzero(levels < 0))
+        raise ValueError(f"Dependency cycle: {' -> '.join(cycle)}")
+    return levels
+
+
+def iter_bits(bits):
+    # Positions of the set bits of an integer, lowest first.
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def reachable_bitsets(graph, keep=None):
+    # For every activity, the activities for which keep (a boolean mask) is
+    # true which can be reached from it; those which can be reached through
+    # activities which are not kept only; and those which can be reached
+    # through another kept activity. All three are bitsets (Python ints) in
+    # which bit b stands for kept[b], built from each activity's successors
+    # in reverse topological order, so the cost is a few bitwise operations
+    # per relation. Returns (kept, reach, nearest, implied).
+    n = len(graph)
+    keep = numpy.ones(n, dtype=bool) if keep is None else numpy.asarray(keep)
+    kept = numpy.flatnonzero(keep)
+    bit = numpy.zeros(n, dtype=numpy.int64)
+    bit[kept] = numpy.arange(len(kept))
+
+    reach = [0] * n
+    nearest = [0] * n
+    implied = [0] * n
+    order = numpy.argsort(topological_levels(graph), kind="stable")
+    for v in order[::-1].tolist():
+        far = near = through = 0
+        for w in graph.successor_ids(v).tolist():
+            if keep[w]:
+                near |= 1 << int(bit[w])
+                far |= reach[w] | 1 << int(bit[w])
+                through |= reach[w]
+            else:
+                near |= nearest[w]
+                far |= reach[w]
+                through |= implied[w]
+        reach[v], nearest[v], implied[v] = far, near, through
+    return kept, reach, nearest, implied
+
+
+def transitive_reduction(graph, keep=None):
+    # The relations between the activities for which keep (a boolean mask)
+    # is true which are not implied by other relations, as a DependencyGraph
+    # of those activities in their original order. Activities which are not
+    # kept (e.g. tasks, when only milestones are to be shown) are collapsed
+    # into relations between the kept activities either side of them.
+    kept, _, nearest, implied = reachable_bitsets(graph, keep)
+    preds, succs = [], []
+    for i, v in enumerate(kept.tolist()):
+        for b in iter_bits(nearest[v] & ~implied[v]):
+            preds.append(i)
+            succs.append(b)
+    return DependencyGraph([graph.codes[i] for i in kept], preds, succs)
+
+
+def reduced_dependencies(milestones, keep):
+    # The transitively reduced relations between those of the milestones
+    # (or tasks) for which keep(ms) is true, following relations through
+    # all the others which are loaded.
+    graph = DependencyGraph.from_milestones(milestones).subgraph(len(milestones))
+    return transitive_reduction(graph, [keep(ms) for ms in milestones])
+
+
+def ancestor_mask(graph, target):
+    # The activities from which target can be reached, including itself.
+    mask = numpy.zeros(len(graph), dtype=bool)
+    mask[target] = True
+    frontier = numpy.array([target])
+    while len(frontier):
+        found = numpy.unique(graph.predecessor_ids_of(frontier))
+        frontier = found[~mask[found]]
+        mask[frontier] = True
+    return mask
+
+
+def descendant_mask(graph, ids):
+    # The activities which can be reached from any of ids, including them.
+    mask = numpy.zeros(len(graph), dtype=bool)
+    mask[ids] = True
+    frontier = numpy.asarray(ids, dtype=numpy.int64)
+    while len(frontier):
+        found = numpy.unique(graph.successor_ids_of(frontier))
+        frontier = found[~mask[found]]
+        mask[frontier] = True
+    return mask
+
+
+@dataclass
+class ScheduleAnalysis(object):
+    """Critical path analysis of a network of activities.
+
+    Dates are in days since the epoch, as floats so that missing dates can
+    be held as infinities. ``total_float`` is NaN for activities which do
+    not lead to the target.
+    """
+
+    codes: List[str]
+    early_start: numpy.ndarray
+    early_finish: numpy.ndarray
+    late_start: numpy.ndarray
+    late_finish: numpy.ndarray
+    total_float: numpy.ndarray
+    completed: numpy.ndarray
+    target: Optional[str] = None
+    # Codes of the activities driving the target, in order, ending with it.
+    critical_path: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.ids = {code: i for i, code in enumerate(self.codes)}
+
+    def index(self, code):
+        return self.ids[code]
+
+    def critical_codes(self, max_float=0):
+        # Incomplete activities with no more than max_float days of float.
+        mask = (self.total_float <= max_float) & ~self.completed
+        return {self.codes[i] for i in numpy.flatnonzero(mask)}
+
+    @staticmethod
+    def date(days):
+        return to_date(days)
+
+
+def activity_dates(table):
+    # Durations, earliest starts and fixed finishes (for completed
+    # activities), in days. Milestones take no time; a task runs from its
+    # start to its forecast finish.
+    def days(column):
+        values = column.astype("datetime64[D]").astype(numpy.float64)
+        values[numpy.isnat(column)] = -numpy.inf
+        return values
+
+    finish = days(table.fdue)
+    start = days(table.start)
+    start = numpy.where(numpy.isfinite(start), start, finish)
+    milestone = numpy.array(
+        ["Milestone" in tasktype for tasktype in table.categories["tasktype"]]
+    )[table.columns["tasktype"]]
+    duration = numpy.where(
+        milestone | ~numpy.isfinite(finish), 0, numpy.maximum(finish - start, 0)
+    )
+    return duration, finish - duration, days(table.completed)
+
+
+def group_by(keys, count):
+    # The order which sorts keys (integers in range(count)), and the bounds
+    # of each key's run within it.
+    order = numpy.argsort(keys, kind="stable")
+    return order, numpy.searchsorted(keys[order], numpy.arange(count + 1))
+
+
+class Network(object):
+    """A network of activities, prepared for forward and backward passes.
+
+    The activities are grouped by topological level, and the relations by
+    the level of their successor (for the forward pass) and predecessor (for
+    the backward pass), so that each pass is a loop over levels rather than
+    activities, and can run many trials at once.
+    """
+
+    def __init__(self, table):
+        n = len(table)
+        self.graph = graph = table.graph.subgraph(n)
+        levels = topological_levels(graph)
+        self.duration, self.floor, self.completed_date = activity_dates(table)
+        self.completed = numpy.isfinite(self.completed_date)
+
+        self.num_levels = levels.max(initial=-1) + 1
+        self.by_level = group_by(levels, self.num_levels)
+        self.forward = self._runs(levels, graph.succ_ids)
+        self.backward = group_by(levels[graph.pred_ids], self.num_levels)
+        self.has_predecessors = numpy.bincount(graph.succ_ids, minlength=n) > 0
+        self.lag = self._lags()
+        self.has_successors = numpy.bincount(graph.pred_ids, minlength=n) > 0
+
+    def _runs(self, levels, succs):
+        # For each level, the relations into activities of that level, in
+        # order of successor, with the successors and where each one's run
+        # of relations begins, so that the latest predecessor of each can be
+        # found with a single reduceat().
+        order = numpy.lexsort((succs, levels[succs]))
+        bounds = numpy.searchsorted(
+            levels[succs][order], numpy.arange(self.num_levels + 1)
+        )
+        runs = []
+        for level in range(self.num_levels):
+            edges = order[bounds[level] : bounds[level + 1]]
+            starts = numpy.flatnonzero(numpy.diff(succs[edges], prepend=-1))
+            runs.append((edges, succs[edges][starts], starts))
+        return runs
+
+    def _lags(self):
+        # The lag implied by the schedule for each relation: the successor's
+        # scheduled start less the predecessor's scheduled finish, whatever
+        # the type of the relation. Zero where either date is unknown.
+        finish = numpy.where(
+            self.completed, self.completed_date, self.floor + self.duration
+        )
+        with numpy.errstate(invalid="ignore"):
+            lag = self.floor[self.graph.succ_ids] - finish[self.graph.pred_ids]
+        return numpy.where(numpy.isfinite(lag), lag, 0)
+
+    def __len__(self):
+        return len(self.graph)
+
+    @staticmethod
+    def _level(groups, level):
+        order, bounds = groups
+        return order[bounds[level] : bounds[level + 1]]
+
+    def forward_pass(self, duration=None, anchored=False):
+        # Early start and finish dates given the durations, which default
+        # to those in the schedule. Durations may also be an (activities x
+        # trials) array, in which case every trial is run at once. If
+        # anchored, no activity starts before its scheduled start, and each
+        # relation keeps the lag implied by the schedule, so that with the
+        # schedule's own durations the pass reproduces its dates, and
+        # otherwise they are only pushed later by the changes in duration.
+        duration = self.duration if duration is None else duration
+        column = (slice(None),) + (None,) * (duration.ndim - 1)
+        floor = self.floor[column]
+        completed = self.completed[column]
+        completed_date = self.completed_date[column]
+        preds = self.graph.pred_ids
+        lag = self.lag if anchored else numpy.zeros(len(preds))
+
+        floating = self.has_predecessors & (not anchored)
+        early_start = numpy.where(floating[column], -numpy.inf, floor)
+        early_start = numpy.broadcast_to(early_start, duration.shape).copy()
+        early_finish = numpy.full(duration.shape, -numpy.inf)
+        for level in range(self.num_levels):
+            edges, targets, starts = self.forward[level]
+            if len(edges):
+                latest = numpy.maximum.reduceat(
+                    early_finish[preds[edges]] + lag[edges][column], starts
+                )
+                early_start[targets] = numpy.maximum(early_start[targets], latest)
+            nodes = self._level(self.by_level, level)
+            early_finish[nodes] = numpy.where(
+                completed[nodes],
+                completed_date[nodes],
+                early_start[nodes] + duration[nodes],
+            )
+        early_start = numpy.where(completed, completed_date - duration, early_start)
+        return early_start, early_finish
+
+
+def analyse_schedule(milestones, target=None):
+    # Forward and backward passes over the network of finish-to-start
+    # relations between the given activities (milestones and, if loaded,
+    # tasks). Activities with no predecessors start on their forecast start
+    # date, and completed activities finish on their completion date. The
+    # backward pass runs from the target if one is given (so that the float
+    # is that with respect to the target), or else from the latest finish.
+    if isinstance(milestones, MilestoneTable):
+        table = milestones
+    else:
+        table = MilestoneTable(milestones)
+    network = Network(table)
+    graph, n, duration = network.graph, len(network), network.duration
+    preds, succs = graph.pred_ids, graph.succ_ids
+    early_start, early_finish = network.forward_pass()
+
+    if target is not None:
+        if target not in graph:
+            raise ValueError(f"Unknown activity {target}")
+        target_id = graph.ids[target]
+        included = ancestor_mask(graph, target_id)
+        late_finish = numpy.full(n, numpy.inf)
+        late_finish[target_id] = early_finish[target_id]
+    else:
+        included = numpy.ones(n, dtype=bool)
+        finite = early_finish[numpy.isfinite(early_finish)]
+        end = finite.max() if len(finite) else 0
+        late_finish = numpy.where(network.has_successors, numpy.inf, end)
+
+    late_start = numpy.full(n, numpy.inf)
+    for level in reversed(range(network.num_levels)):
+        edges = network._level(network.backward, level)
+        edges = edges[included[succs[edges]]]
+        numpy.minimum.at(late_finish, preds[edges], late_start[succs[edges]])
+        nodes = network._level(network.by_level, level)
+        late_start[nodes] = late_finish[nodes] - duration[nodes]
+
+    with numpy.errstate(invalid="ignore"):
+        total_float = numpy.where(included, late_start - early_start, numpy.nan)
+
+    analysis = ScheduleAnalysis(
+        codes=graph.codes,
+        early_start=early_start,
+        early_finish=early_finish,
+        late_start=late_start,
+        late_finish=late_finish,
+        total_float=total_float,
+        completed=network.completed,
+        target=target,
+    )
+    if target is not None:
+        analysis.critical_path = driving_path(analysis, graph, target_id)
+    return analysis
+
+
+def driving_path(analysis, graph, target_id):
+    # Walk back from the target through the predecessor which determined
+    # each activity's early start, stopping at an activity which started on
+    # its own date or was completed.
+    path = [target_id]
+    i = target_id
+    while not analysis.completed[i] and numpy.isfinite(analysis.early_start[i]):
+        drivers = [
+            int(j)
+            for j in graph.predecessor_ids(i)
+            if analysis.early_finish[j] == analysis.early_start[i]
+        ]
+        if not drivers:
+            break
+        i = min(drivers, key=lambda j: (analysis.total_float[j], j))
+        path.append(i)
+    return [graph.codes[i] for i in reversed(path)]
+
+
+def critical(args, milestones):
+    require_codes(milestones, [args.target])
+    analysis = analyse_schedule(milestones, args.target)
+    print(f"Critical path to {args.target}:")
+    for code in analysis.critical_path:
+        i = analysis.index(code)
+        start = analysis.date(analysis.early_start[i])
+        finish = analysis.date(analysis.early_finish[i])
+        state = "completed" if analysis.completed[i] else "float"
+        if not analysis.completed[i]:
+            state += f" {analysis.total_float[i]:g}d"
+        print(f"    {code} {start} {finish} ({state})")
+    near = analysis.critical_codes(args.max_float)
+    print(
+        f"{len(near)} incomplete activities have no more than "
+        f"{args.max_float} days of float to {args.target}"
+    )
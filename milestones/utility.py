@@ -1,25 +1,29 @@
-import glob
 import logging
 import os
 import re
-import subprocess
 import sys
 import time
-from datetime import datetime
-
-import yaml
+from contextlib import contextmanager
 
+from .cache import load_pmcs_cached
+from .catalog import get_catalog, month_of
 from .excel import load_pmcs_excel
+from .options import get_pmcs_dir
+from .overlay import load_overlay
+from .provenance import get_provenance
 
 __all__ = [
     "add_latex_citations",
     "add_rst_citations",
     "escape_latex",
+    "fail",
+    "find_pmcs_files",
     "format_latex",
     "get_pmcs_path_months",
     "get_latest_pmcs_path",
-    "get_local_data_path",
     "load_milestones",
+    "open_output",
+    "require_codes",
     "write_output",
     "get_version_info",
 ]
@@ -46,46 +50,62 @@ DOC_HANDLES = [
 
 # Input filename format:
 #
-# YYYYMM-<datatype>.xls
+# YYYYMM-<datatype>.<ext>
 #
 # Where YYYY is the year, MM is the month and <datatype> is either "BL" (for
-# baseline) or "ME" (for forecast).
+# baseline) or "ME" (for forecast). <ext> is any of the formats for which
+# readers.py provides a reader.
+
+
+def find_pmcs_files(path=None):
+    """Find all forecast extracts, one per month, in date order. If a month
+    is available in several formats, the first listed in READERS is used."""
+    return list(get_catalog(path or get_pmcs_dir()))
 
 
 def get_pmcs_path_months(cpath=None, months=3):
-    """Get the list of pmcs files - find the one passed and
-    take the one months prior."""
-    path = os.path.normpath(
-        os.path.join(os.path.dirname(__file__), "..", "data", "pmcs")
+    """Get the pmcs file for the calendar month the given number of months
+    before that of cpath. If there is no extract for that month, the
+    nearest earlier one is used; if there is none, FileNotFoundError is
+    raised."""
+    directory = os.path.dirname(cpath) or get_pmcs_dir()
+    catalog = get_catalog(directory)
+    month = catalog.months_before(month_of(cpath), months)
+    if month in catalog:
+        return catalog[month]
+    path = catalog.nearest_earlier(month)
+    if path is None:
+        raise FileNotFoundError(
+            f"No PMCS extract in {directory} for {month[0]}{month[1]:02d} "
+            f"({months} months before {os.path.basename(cpath)}) or earlier"
+        )
+    logging.getLogger(__name__).warning(
+        f"No PMCS extract for {month[0]}{month[1]:02d}; using {path}"
     )
-    all_files = sorted(glob.glob(os.path.join(path, "??????-ME.xls")))
-    for ind, f in enumerate(all_files):
-        if f.__contains__(cpath) and ind >= months:
-            return all_files[ind - months]
+    return path
 
 
 def get_latest_pmcs_path(path=None):
     """By default, fetch the latest forecast."""
-    if not path:
-        path = os.path.normpath(
-            os.path.join(os.path.dirname(__file__), "..", "data", "pmcs")
-        )
-    return sorted(glob.glob(os.path.join(path, "??????-ME.xls")))[-1]
+    return get_catalog(path or get_pmcs_dir()).latest()
 
 
-def get_local_data_path(path=os.path.dirname(__file__)):
-    return os.path.normpath(
-        os.path.join(os.path.dirname(__file__), "..", "data", "local.yaml")
-    )
-
-
-def write_output(filename, content, comment_prefix="%"):
+@contextmanager
+def open_output(filename, comment_prefix="%", provenance=None):
+    # Open filename for writing, with the standard header already written,
+    # so that large outputs can be streamed rather than built in memory.
     print(f"Writing output to {filename}")
+    source = f" from {provenance}" if provenance else ""
     with open(filename, "w") as f:
         f.write(
             f"{comment_prefix} Auto-generated by {sys.argv[0]} "
-            f"on {time.strftime('%c')} - DO NOT EDIT\n\n"
+            f"on {time.strftime('%c')}{source} - DO NOT EDIT\n\n"
         )
+        yield f
+
+
+def write_output(filename, content, comment_prefix="%", provenance=None):
+    with open_output(filename, comment_prefix, provenance) as f:
         f.write(content)
 
 
@@ -126,58 +146,48 @@ def add_rst_citations(text, cite_handles=DOC_HANDLES):
         return add_citations(text, cite_handles, r"\1 :cite:`\1`")
 
 
-def load_milestones(pmcs_filename, local_data_filename, load_tasks=False):
+def fail(message):
+    # Report bad input to a subcommand and exit.
+    logging.getLogger(__name__).error(message)
+    sys.exit(1)
+
+
+def require_codes(milestones, codes, kind="activity"):
+    # For codes given on the command line: fail unless every one of them is
+    # among the milestones.
+    known = {ms.code for ms in milestones}
+    missing = [code for code in codes if code not in known]
+    if missing:
+        fail(f"Unknown {kind}: {', '.join(missing)}")
+
+
+def load_milestones(
+    pmcs_filename,
+    local_data_filename,
+    load_tasks=False,
+    use_cache=True,
+    ms_filter=None,
+):
     logger = logging.getLogger(__name__)
 
     logger.info(f"Loading PMCS data from: {pmcs_filename}")
     logger.info(f"Loading local annotations from: {local_data_filename}")
-    milestones = load_pmcs_excel(pmcs_filename, load_tasks)
-
-    with open(local_data_filename) as f:
-        local = yaml.safe_load(f)
-    for ms in milestones:
-        if ms.code in local:
-            # These are core PMCS attributes; we should warn if we
-            # over-write them.
-            for attribute in ["name", "wbs", "level", "predecessors", "successors"]:
-                if attribute in local[ms.code]:
-                    logger.info(
-                        f"Overriding PMCS {attribute} on {ms.code} "
-                        f"Overriding PMCS {attribute} on {ms.code} "
-                        f"(was “{getattr(ms, attribute)}”; "
-                        f"now “{local[ms.code][attribute]}”)"
-                    )
-                    setattr(ms, attribute, local[ms.code][attribute])
-
-            for attribute in ["due", "completed"]:
-                if attribute in local[ms.code]:
-                    logger.warning(
-                        f"Overriding PMCS {attribute} on {ms.code} "
-                        f"(was {getattr(ms, attribute)}; "
-                        f"now {local[ms.code][attribute]})"
-                    )
-                    if local[ms.code][attribute] == "":
-                        setattr(ms, attribute, None)
-                    else:
-                        setattr(
-                            ms,
-                            attribute,
-                            datetime.strptime(local[ms.code][attribute], "%Y-%m-%d"),
-                        )
-
-            for attribute in [
-                "aka",
-                "description",
-                "comment",
-                "short_name",
-                "test_spec",
-                "jira",
-                "jira_testplan",
-                "summarychart",
-            ]:
-                if attribute in local[ms.code]:
-                    logger.info(f"Setting {attribute} on {ms.code}")
-                    setattr(ms, attribute, local[ms.code][attribute])
+    overlay = load_overlay(local_data_filename, use_cache)
+
+    if ms_filter:
+        # Local annotations may change whether a milestone passes the filter,
+        # so always read those milestones and filter again afterwards.
+        ms_filter = ms_filter.with_codes(overlay.codes())
+
+    if use_cache:
+        milestones = load_pmcs_cached(pmcs_filename, load_tasks, ms_filter=ms_filter)
+    else:
+        milestones = load_pmcs_excel(pmcs_filename, load_tasks, ms_filter=ms_filter)
+
+    overlay.apply(milestones)
+
+    if ms_filter:
+        milestones = [ms for ms in milestones if ms_filter(ms)]
 
     return milestones
 
@@ -185,18 +195,4 @@ def load_milestones(pmcs_filename, local_data_filename, load_tasks=False):
 def get_version_info(pmcs_path=None):
     if pmcs_path is None:
         pmcs_path = get_latest_pmcs_path()
-    git_dir = os.path.dirname(pmcs_path)
-    if git_dir == "":
-        git_dir = "."
-    sha, date = (
-        subprocess.check_output(
-            ["git", "log", "-1", "--pretty=format:'%H %ad'", "--date=unix"], cwd=git_dir
-        )
-        .decode("utf-8")
-        .strip("'")
-        .split()
-    )
-    split = os.path.basename(pmcs_path).split("-")
-    p6_date = datetime.strptime(split[0], "%Y%m")
-
-    return sha, datetime.utcfromtimestamp(int(date)), p6_date
+    return get_provenance(pmcs_path).as_tuple()
@@ -0,0 +1,195 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+
+from .depgraph import DependencyGraph
+from .schedule import descendant_mask, topological_levels
+from .utility import fail, load_milestones, require_codes
+
+__all__ = [
+    "Change",
+    "Reschedule",
+    "load_rescheduled",
+    "parse_change",
+    "reschedule",
+    "whatif",
+]
+
+# Dates which may be changed. Only a change to the forecast is passed on to
+# the successors; the baseline is for comparison.
+CHANGE_FIELDS = ["fdue", "due"]
+
+DELTA = re.compile(r"^([+-]\d+)([dw]?)$")
+
+
+@dataclass(frozen=True)
+class Change(object):
+    """A hypothetical change to one date of an activity: either a shift by
+    ``delta`` or a new ``date``."""
+
+    code: str
+    field: str
+    delta: Optional[timedelta] = None
+    date: Optional[datetime] = None
+
+    def apply(self, value):
+        if self.date is not None:
+            return self.date
+        return value + self.delta if value else value
+
+
+def parse_change(text):
+    # Parse "<code> <field> <change>", where change is a number of days (or
+    # weeks) such as "+30d", "-2w" or "+10", or a date such as "2024-05-01".
+    try:
+        code, name, value = text.split()
+    except ValueError:
+        raise ValueError(f"Expected '<code> <field> <change>', not '{text}'") from None
+    if name not in CHANGE_FIELDS:
+        raise ValueError(f"Cannot change {name}; choose from {CHANGE_FIELDS}")
+    match = DELTA.match(value)
+    if match:
+        days = int(match.group(1)) * (7 if match.group(2) == "w" else 1)
+        return Change(code, name, delta=timedelta(days=days))
+    return Change(code, name, date=datetime.fromisoformat(value))
+
+
+@dataclass
+class Reschedule(object):
+    """The activities with some dates changed, and what has moved."""
+
+    milestones: list
+    # Code to (old, new) forecast for every activity whose forecast moved.
+    moved: Dict[str, Tuple[datetime, datetime]] = field(default_factory=dict)
+    # Codes of the activities downstream of the changes, in the order they
+    # were rescheduled.
+    affected: List[str] = field(default_factory=list)
+
+
+def duration_of(ms):
+    # Milestones take no time; a task runs from its start to its forecast.
+    if "Milestone" in ms.tasktype or not ms.fdue or not ms.start:
+        return timedelta(0)
+    return max(ms.fdue - ms.start, timedelta(0))
+
+
+def reschedule(milestones, changes):
+    # Apply the changes and push later every activity downstream of a
+    # delayed forecast by as much of the delay as its slack does not absorb.
+    # Only those descendants are visited, in topological order, and only a
+    # delay is passed on: an activity is never brought earlier than it is
+    # scheduled because its predecessors are. Completed activities are not
+    # moved. The given milestones are not modified.
+    milestones = list(milestones)
+    # The activities are found by their ids in the graph, which are only
+    # their indices if the codes are unique.
+    duplicates = [
+        code for code, n in Counter(ms.code for ms in milestones).items() if n > 1
+    ]
+    if duplicates:
+        raise ValueError(f"Duplicate activity codes: {', '.join(sorted(duplicates))}")
+    graph = DependencyGraph.from_milestones(milestones).subgraph(len(milestones))
+    for change in changes:
+        if change.code not in graph:
+            raise ValueError(f"Unknown activity {change.code}")
+
+    new_fdue = {}
+    for change in changes:
+        i = graph.ids[change.code]
+        ms = milestones[i]
+        if change.field == "fdue":
+            new_fdue[i] = change.apply(new_fdue.get(i, ms.fdue))
+        else:
+            value = change.apply(getattr(ms, change.field))
+            milestones[i] = replace(ms, **{change.field: value})
+
+    # The subgraph downstream of the changed forecasts, in topological order.
+    mask = descendant_mask(graph, sorted(new_fdue))
+    ids = numpy.flatnonzero(mask)
+    local = numpy.full(len(graph), -1, dtype=numpy.int64)
+    local[ids] = numpy.arange(len(ids))
+    inside = mask[graph.pred_ids] & mask[graph.succ_ids]
+    subgraph = DependencyGraph(
+        [graph.codes[i] for i in ids],
+        local[graph.pred_ids[inside]],
+        local[graph.succ_ids[inside]],
+    )
+    order = ids[numpy.argsort(topological_levels(subgraph), kind="stable")]
+
+    # Each activity is pushed by the largest delay of its predecessors' new
+    # finishes over their old ones, less the slack it already had after
+    # each. Only the moves are passed on, not the dates themselves, so an
+    # activity whose predecessor did not move stays put whatever the type
+    # or lag of the relation, and nothing moves further than a change.
+    result = Reschedule(milestones)
+    old_fdue = {}
+    delay = {}
+    for i in order.tolist():
+        ms = milestones[i]
+        result.affected.append(ms.code)
+        old_fdue[i] = fdue = ms.fdue
+        if i in new_fdue:
+            fdue = new_fdue[i]
+        elif not ms.completed and fdue:
+            start = fdue - duration_of(ms)
+            pushes = [
+                delay[p] - max(start - old_fdue[p], timedelta(0))
+                for p in graph.predecessor_ids(i).tolist()
+                if delay.get(p) and old_fdue[p]
+            ]
+            fdue += max(pushes + [timedelta(0)])
+        if fdue and ms.fdue:
+            delay[i] = max(fdue - ms.fdue, timedelta(0))
+        if fdue != ms.fdue:
+            result.moved[ms.code] = (ms.fdue, fdue)
+            milestones[i] = replace(ms, fdue=fdue)
+    return result
+
+
+def load_rescheduled(
+    pmcs_filename,
+    local_data_filename,
+    changes,
+    load_tasks=False,
+    use_cache=True,
+    ms_filter=None,
+):
+    # As load_milestones(), but with the changes applied. The whole network,
+    # including tasks, is loaded so that delays are passed on through it;
+    # the tasks and the milestones which do not pass ms_filter are then
+    # dropped as usual.
+    milestones = load_milestones(
+        pmcs_filename, local_data_filename, load_tasks=True, use_cache=use_cache
+    )
+    milestones = reschedule(milestones, changes).milestones
+    return [
+        ms
+        for ms in milestones
+        if (load_tasks or "Milestone" in ms.tasktype)
+        and (not ms_filter or ms_filter(ms))
+    ]
+
+
+def whatif(args, milestones):
+    require_codes(milestones, [change.code for change in args.changes])
+    try:
+        result = reschedule(milestones, args.changes)
+    except ValueError as e:
+        fail(str(e))
+    moved = [
+        ms
+        for ms in result.milestones
+        if ms.code in result.moved and "Milestone" in ms.tasktype
+    ]
+    print(
+        f"{len(result.affected)} activities downstream; "
+        f"{len(moved)} milestone forecasts move:"
+    )
+    for ms in sorted(moved, key=lambda x: (x.fdue, x.code)):
+        old, new = result.moved[ms.code]
+        shift = (new - old).days
+        print(f"    {ms.code} ({ms.name}) {old.date()} -> {new.date()} ({shift:+d}d)")
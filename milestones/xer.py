@@ -0,0 +1,209 @@
+import re
+
+from .pmcsreader import RELATION_SHEET_NAME, TASK_SHEET_NAME, PMCSReader
+
+__all__ = ["XerReader", "read_xer"]
+
+# Primavera's internal enumerations, and the labels used for them in the
+# spreadsheet export.
+TASK_TYPES = {
+    "TT_Mile": "Start Milestone",
+    "TT_FinMile": "Finish Milestone",
+    "TT_Task": "Task Dependent",
+    "TT_Rsrc": "Resource Dependent",
+    "TT_LOE": "Level of Effort",
+    "TT_WBS": "WBS Summary",
+}
+
+STATUS_CODES = {
+    "TK_NotStart": "Not Started",
+    "TK_Active": "In Progress",
+    "TK_Complete": "Completed",
+}
+
+# The spreadsheet export names columns for user defined fields after the UDF
+# type id, and columns for activity codes after the activity code type.
+USER_FIELD = re.compile(r"user_field_(\d+)$")
+ACTV_CODE = re.compile(r"actv_code_(\w+)_id$")
+
+
+def actv_code_field(type_name):
+    # "Celebratory Achievements" -> "celebratory_achievements"
+    return re.sub(r"\W+", "_", type_name.strip().lower())
+
+
+def read_xer(path, tables, encoding="cp1252"):
+    # Tokenize an XER file one line at a time, yielding (table, record) for
+    # each record of the given tables, where record is a dict of field name
+    # to (string) value. Records of any other table are never split.
+    table = fields = None
+    with open(path, encoding=encoding, errors="replace", newline="") as f:
+        for line in f:
+            if line.startswith("%R\t"):
+                if table in tables:
+                    values = line.rstrip("\r\n").split("\t")[1:]
+                    yield table, dict(zip(fields, values))
+            elif line.startswith("%T\t"):
+                table = line.rstrip("\r\n")[3:]
+            elif line.startswith("%F\t"):
+                fields = line.rstrip("\r\n").split("\t")[1:]
+
+
+class XerReader(PMCSReader):
+    """Primavera P6 XER exports, streamed one line at a time.
+
+    The TASK and TASKPRED tables are presented with the field names and
+    values of the spreadsheet export: task ids are replaced by task codes,
+    enumerations by their labels, and the WBS path, user defined fields and
+    activity codes are joined in from their own tables. Those mostly follow
+    TASK in the file, so they are gathered into lookups by task_id in a first
+    pass, and the tasks themselves streamed in a second.
+
+    If the project's baseline is included in the export, base_end_date is
+    the finish date of the same task in the baseline project; otherwise it is
+    the planned finish (target_end_date) of the task itself.
+    """
+
+    def __init__(self, path, encoding="cp1252"):
+        super().__init__(path)
+        self.encoding = encoding
+        self._task_codes = None
+        self._baselines = None
+
+    def _records(self, *tables):
+        return read_xer(self.path, tables, self.encoding)
+
+    def _scan(self, user_fields=(), code_types=()):
+        # First pass: everything needed to fill in the requested fields of a
+        # TASK row, keyed by task_id.
+        user_values = {type_id: {} for type_id in user_fields}
+        code_values = {name: {} for name in code_types}
+        type_names, code_names, task_codes = {}, {}, []
+        wbs, baselines, base_dates = {}, set(), {}
+        self._task_codes = {}
+
+        for table, record in self._records(
+            "PROJECT", "PROJWBS", "ACTVTYPE", "ACTVCODE", "TASKACTV", "UDFVALUE", "TASK"
+        ):
+            if table == "TASK":
+                self._task_codes[record["task_id"]] = record["task_code"]
+                if record.get("proj_id") in baselines:
+                    base_dates[record["task_code"]] = record.get("target_end_date", "")
+            elif table == "TASKACTV":
+                task_codes.append((record["task_id"], record["actv_code_id"]))
+            elif table == "UDFVALUE":
+                if record["udf_type_id"] in user_values:
+                    user_values[record["udf_type_id"]][record.get("fk_id")] = (
+                        record.get("udf_number")
+                        or record.get("udf_text")
+                        or record.get("udf_date", "")
+                    )
+            elif table == "PROJWBS":
+                wbs[record["wbs_id"]] = (
+                    record.get("parent_wbs_id", ""),
+                    record["wbs_short_name"],
+                    record.get("proj_node_flag") == "Y",
+                )
+            elif table == "ACTVCODE":
+                code_names[record["actv_code_id"]] = (
+                    record.get("actv_code_type_id"),
+                    record["short_name"],
+                )
+            elif table == "ACTVTYPE":
+                name = actv_code_field(record["actv_code_type"])
+                if name in code_values:
+                    type_names[record["actv_code_type_id"]] = name
+            elif table == "PROJECT":
+                if record.get("sum_base_proj_id"):
+                    baselines.add(record["sum_base_proj_id"])
+
+        for task_id, actv_code_id in task_codes:
+            type_id, short_name = code_names.get(actv_code_id, (None, ""))
+            if type_id in type_names:
+                code_values[type_names[type_id]][task_id] = short_name
+
+        self._baselines = baselines
+        return user_values, code_values, wbs, base_dates
+
+    @staticmethod
+    def _wbs_path(wbs, wbs_id, paths):
+        # "<project> <element>.<element>...", as rendered by the spreadsheet
+        # export and expected by extract_wbs().
+        if wbs_id not in paths:
+            names, node = [], wbs_id
+            while node in wbs:
+                parent, name, project_node = wbs[node]
+                if project_node:
+                    break
+                names.append(name)
+                node = parent
+            project = wbs[node][1] if node in wbs else ""
+            paths[wbs_id] = f"{project} {'.'.join(reversed(names))}".strip()
+        return paths[wbs_id]
+
+    def _task_getter(self, field, user_values, code_values, wbs, base_dates):
+        if field == "task_type":
+            return lambda r: TASK_TYPES.get(r.get(field, ""), r.get(field, ""))
+        if field == "status_code":
+            return lambda r: STATUS_CODES.get(r.get(field, ""), r.get(field, ""))
+        if field == "start_date":
+            return lambda r: (
+                r.get("act_start_date")
+                or r.get("restart_date")
+                or r.get("early_start_date")
+                or r.get("target_start_date", "")
+            )
+        if field == "end_date":
+            return lambda r: (
+                r.get("act_end_date")
+                or r.get("reend_date")
+                or r.get("early_end_date")
+                or r.get("target_end_date", "")
+            )
+        if field == "base_end_date":
+            if self._baselines:
+                return lambda r: base_dates.get(r.get("task_code"), "")
+            return lambda r: r.get("target_end_date", "")
+        if field == "wbs_id":
+            paths = {}
+            return lambda r: self._wbs_path(wbs, r.get("wbs_id"), paths)
+        if USER_FIELD.match(field):
+            values = user_values[USER_FIELD.match(field).group(1)]
+            return lambda r: values.get(r.get("task_id"), "")
+        if ACTV_CODE.match(field):
+            values = code_values[ACTV_CODE.match(field).group(1)]
+            return lambda r: values.get(r.get("task_id"), "")
+        return lambda r: r.get(field, "")
+
+    def rows(self, table, fields):
+        if table == TASK_SHEET_NAME:
+            return self._task_rows(fields)
+        if table == RELATION_SHEET_NAME:
+            return self._relation_rows(fields)
+        raise KeyError(f"No table {table} in {self.path}")
+
+    def _task_rows(self, fields):
+        lookups = self._scan(
+            [m.group(1) for m in map(USER_FIELD.match, fields) if m],
+            [m.group(1) for m in map(ACTV_CODE.match, fields) if m],
+        )
+        getters = [self._task_getter(field, *lookups) for field in fields]
+        for _, record in self._records("TASK"):
+            if record.get("proj_id") in self._baselines:
+                continue
+            yield tuple(getter(record) for getter in getters)
+
+    def _relation_rows(self, fields):
+        if self._task_codes is None:
+            self._scan()
+        codes = self._task_codes
+        for _, record in self._records("TASKPRED"):
+            if record.get("proj_id") in self._baselines:
+                continue
+            # Both ends of a relation are given as task codes.
+            yield tuple(
+                codes.get(record.get(field), "")
+                if field.endswith("task_id")
+                else record.get(field, "")
+                for field in fields
+            )
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import matplotlib
+import pytest
+
+from milestones import Milestone
+from milestones.cartoon_config import categoryGrouping
+
+# Every category of the block schedule, which expects each to be present.
+CATEGORIES = [category for group in categoryGrouping for category in group]
+
+# Charts are only written to files.
+matplotlib.use("Agg")
+
+
+def make_milestone(code, due, fdue=None, completed=None, **kwargs):
+    return Milestone(
+        code=code,
+        tasktype=kwargs.pop("tasktype", "Finish Milestone"),
+        name=kwargs.pop("name", f"Milestone {code}"),
+        wbs=kwargs.pop("wbs", "02C.01"),
+        level=kwargs.pop("level", 2),
+        due=due,
+        fdue=fdue or due,
+        completed=completed,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def milestones():
+    # Milestones due monthly over two years, each forecast up to ten weeks
+    # late; the first third are completed, and all are charted in one of the
+    # block schedule categories.
+    start = datetime(2021, 1, 1)
+    result = []
+    for i in range(24):
+        due = start + timedelta(days=30 * i)
+        fdue = due + timedelta(weeks=i % 11)
+        result.append(
+            make_milestone(
+                f"DM-{i}",
+                due,
+                fdue,
+                completed=fdue if i < 8 else None,
+                start=due - timedelta(days=60),
+                summarychart=f"{CATEGORIES[i % len(CATEGORIES)]}.Activity {i % 3}",
+                celebrate="Top" if i % 6 == 0 else "",
+            )
+        )
+    return result
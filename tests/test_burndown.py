@@ -0,0 +1,64 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy
+import pytest
+
+from milestones import compute_burndown, period_starts
+
+from .conftest import make_milestone
+
+START, END = datetime(2020, 1, 1), datetime(2024, 12, 31)
+
+
+def random_milestones(n, seed):
+    # Dates fall on whole days, so that many coincide with period starts.
+    rng = random.Random(seed)
+
+    def date():
+        return START + timedelta(days=rng.randrange((END - START).days))
+
+    result = []
+    for i in range(n):
+        ms = make_milestone(f"DM-{i}", date(), date())
+        if rng.random() < 0.4:
+            ms.completed = date()
+        if rng.random() < 0.7:
+            ms.prior_fdue = {1: date()}
+        result.append(ms)
+    return result
+
+
+def open_counts(milestones, dates, date_of):
+    # The loop compute_burndown() replaced: count, for every period, the
+    # milestones whose date is unset or later.
+    counts = []
+    for period in dates:
+        remaining = len(milestones)
+        for ms in milestones:
+            value = date_of(ms)
+            if value and value <= period:
+                remaining -= 1
+        counts.append(remaining)
+    return counts
+
+
+@pytest.mark.parametrize("granularity", ["daily", "weekly", "monthly"])
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_loop(granularity, seed):
+    milestones = random_milestones(200, seed)
+    periods = period_starts(START, END, granularity)
+    dates = periods.astype("datetime64[s]").astype(datetime)
+    result = compute_burndown(milestones, periods, horizons=[1])
+
+    assert list(result.baseline) == open_counts(milestones, dates, lambda ms: ms.due)
+    assert list(result.forecast) == open_counts(milestones, dates, lambda ms: ms.fdue)
+    assert list(result.achieved) == open_counts(
+        milestones, dates, lambda ms: ms.completed
+    )
+    # A milestone new since the prior snapshot counts as due on its due date.
+    assert list(result.prior[1]) == open_counts(
+        milestones, dates, lambda ms: ms.prior_fdue.get(1, ms.due)
+    )
+    completed = max(ms.completed for ms in milestones if ms.completed)
+    assert result.last_completed == numpy.datetime64(completed)
@@ -0,0 +1,20 @@
+from argparse import Namespace
+from datetime import datetime
+
+from milestones import generate_doc
+
+from .conftest import make_milestone
+
+
+def test_extract_outside_git(tmp_path, monkeypatch):
+    # The provenance falls back to the extract's name and month when it is
+    # not under version control.
+    monkeypatch.chdir(tmp_path)
+    pmcs_data = tmp_path / "202402-ME.xls"
+    pmcs_data.touch()
+    args = Namespace(months=0, pmcs_comp=None, pmcs_data=str(pmcs_data), table=False)
+    milestones = [make_milestone("DM-1", datetime(2024, 3, 1), milestone_tracking="Y")]
+    doc = generate_doc(args, milestones)
+    assert "extract ``202402-ME.xls``" in doc
+    assert "February 2024" in doc
+    assert (tmp_path / "top_milestones.html").exists()
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+
+from milestones.excel import TASK_FIELDS, extract_task_columns, extract_task_rows
+
+
+def task_row(code, status, act_end_date):
+    values = {
+        "task_code": code,
+        "task_type": "Finish Milestone",
+        "task_name": f"Milestone {code}",
+        "user_field_859": "2",
+        "status_code": status,
+        "act_end_date": act_end_date,
+        "base_end_date": "03/01/2024",
+        "start_date": "04/01/2024",
+        "end_date": "04/01/2024",
+        "wbs_id": "LSST ME 02C.01",
+        "actv_code_celebratory_achievements_id": "",
+        "actv_code_milestone_tracking_id": "",
+        "actv_code_summary_chart_id": "",
+    }
+    return [values[field] for field in TASK_FIELDS]
+
+
+ROWS = [
+    task_row("DM-1", "Completed", "02/15/2024"),
+    # Only the actual end date of a completed activity is used, so a
+    # malformed one elsewhere is ignored, as it always was.
+    task_row("DM-2", "Not Started", "not a date"),
+]
+
+
+def extract_columns(rows, load_tasks):
+    return extract_task_columns([list(column) for column in zip(*rows)], load_tasks)
+
+
+@pytest.mark.parametrize("extract", [extract_task_rows, extract_columns])
+def test_act_end_date_only_for_completed(extract):
+    completed, open_ = extract(ROWS, False)
+    assert completed.completed == datetime(2024, 2, 15)
+    assert open_.completed is None
+    assert open_.fdue == datetime(2024, 4, 1)
+
+
+@pytest.mark.parametrize("extract", [extract_task_rows, extract_columns])
+def test_malformed_completion_date(extract):
+    with pytest.raises(ValueError):
+        extract([task_row("DM-3", "Completed", "not a date")], False)
@@ -0,0 +1,19 @@
+import importlib
+
+import pytest
+
+import milestones
+from milestones import SUBMODULES
+
+
+@pytest.mark.parametrize("module", sorted(SUBMODULES))
+def test_lazy_exports_match_all(module):
+    # The lazily imported names of the package are maintained by hand, and
+    # must be exactly the public names of each submodule.
+    submodule = importlib.import_module(f"milestones.{module}")
+    assert sorted(SUBMODULES[module]) == sorted(submodule.__all__)
+
+
+def test_exports_resolve():
+    for name in milestones.__all__:
+        assert getattr(milestones, name) is not None
@@ -0,0 +1,54 @@
+import re
+from argparse import Namespace
+from datetime import datetime
+
+import pytest
+
+from milestones import graph
+
+from .conftest import make_milestone
+
+
+def network():
+    # M0 -> T1 -> T2 -> M3 -> M4 -> X -> M5, where T1 and T2 are loaded
+    # tasks and X a task which is not loaded.
+    codes = ["M0", "T1", "T2", "M3", "M4", "X", "M5"]
+    activities = {
+        code: make_milestone(
+            code,
+            datetime(2024, 1, 1),
+            tasktype="Task Dependent" if code[0] == "T" else "Finish Milestone",
+        )
+        for code in codes
+        if code != "X"
+    }
+    for pred, succ in zip(codes, codes[1:]):
+        if pred in activities:
+            activities[pred].successors.add(succ)
+        if succ in activities:
+            activities[succ].predecessors.add(pred)
+    return list(activities.values())
+
+
+@pytest.mark.parametrize(
+    "reduce, depth, expected",
+    [
+        (False, 1, ["M0", "M3"]),
+        (False, 2, ["M0", "M3", "M4"]),
+        (False, 3, ["M0", "M3", "M4", "M5"]),
+        (True, 1, ["M0", "M3"]),
+    ],
+)
+def test_around_counts_milestones(tmp_path, reduce, depth, expected):
+    args = Namespace(
+        critical=None,
+        reduce=reduce,
+        around="M0",
+        depth=depth,
+        wbs="02C",
+        output=str(tmp_path / "graph.dot"),
+        pmcs_data=str(tmp_path / "202402-ME.xls"),
+    )
+    graph(args, network())
+    dot = (tmp_path / "graph.dot").read_text()
+    assert sorted(set(re.findall(r'^  "(\w+)" \[', dot, re.M))) == expected
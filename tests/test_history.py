@@ -0,0 +1,93 @@
+import importlib
+import os
+from datetime import datetime
+
+import numpy
+
+from milestones import HistoryStore
+from milestones.cache import content_hash, content_stat
+from milestones.history import get_history_path
+
+
+def snapshot(codes, day):
+    # A snapshot in which every milestone is forecast for the given day of
+    # January 2025, and none is completed.
+    date = datetime(2025, 1, day)
+    return {
+        "codes": codes,
+        "status": ["Not Started"] * len(codes),
+        "due": [date] * len(codes),
+        "fdue": [date] * len(codes),
+        "completed": [None] * len(codes),
+    }
+
+
+def forecast_days(store, code):
+    series = store.series(code).astype("datetime64[D]")
+    return [None if numpy.isnat(d) else d.astype(object).day for d in series]
+
+
+def test_snapshots_in_order(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.npz"))
+    store.add_snapshot("202503", "c", snapshot(["A", "B"], 3))
+    store.add_snapshot("202501", "a", snapshot(["A"], 1))
+    store.add_snapshot("202502", "b", snapshot(["B", "C"], 2))
+    assert store.snapshots == ["202501", "202502", "202503"]
+    assert store.hashes == ["a", "b", "c"]
+    assert forecast_days(store, "A") == [1, None, 3]
+    assert forecast_days(store, "C") == [None, 2, None]
+    assert store.status.shape == store.dates["fdue"].shape == (3, 3)
+
+
+def test_append_grows_geometrically(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.npz"))
+    reallocations = 0
+    for month in range(1, 25):
+        matrix = store._status
+        store.add_snapshot(f"2024{month:02d}", str(month), snapshot(["A"], 1))
+        reallocations += store._status is not matrix
+    assert reallocations <= 6
+
+
+def test_prune_and_reload(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.npz"))
+    for day in (1, 2, 3):
+        store.add_snapshot(f"20250{day}", str(day), snapshot(["A"], day))
+    assert store.prune(["202501", "202503"]) == ["202502"]
+    store.save()
+
+    loaded = HistoryStore.load(store.path)
+    assert loaded.snapshots == ["202501", "202503"]
+    assert forecast_days(loaded, "A") == [1, 3]
+    loaded.add_snapshot("202502", "2", snapshot(["A"], 2))
+    assert forecast_days(loaded, "A") == [1, 2, 3]
+
+
+def test_path_per_directory(tmp_path):
+    assert get_history_path(str(tmp_path / "a")) != get_history_path(
+        str(tmp_path / "b")
+    )
+
+
+def test_update_hashes_only_changed_stats(tmp_path, monkeypatch):
+    path = tmp_path / "202501-ME.xls"
+    path.write_bytes(b"extract")
+    store = HistoryStore(str(tmp_path / "history.npz"))
+    store.add_snapshot(
+        "202501", content_hash(str(path)), snapshot(["A"], 1), content_stat(str(path))
+    )
+    hashed = []
+    # The package's "history" is the subcommand, not the module.
+    module = importlib.import_module("milestones.history")
+    monkeypatch.setattr(
+        module, "content_hash", lambda p: hashed.append(p) or content_hash(p)
+    )
+
+    assert store.update([str(path)]) == []
+    assert hashed == []
+
+    # Touched but unchanged: hashed once, not read, and the new stats kept.
+    os.utime(path, ns=(0, 0))
+    assert store.update([str(path)]) == ["202501"]
+    assert store.update([str(path)]) == []
+    assert hashed == [str(path)]
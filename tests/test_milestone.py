@@ -0,0 +1,19 @@
+from dataclasses import asdict
+from datetime import datetime
+
+from milestones import MilestoneTable, SlottedMilestone
+
+from .conftest import make_milestone
+
+
+def test_slotted_round_trip():
+    milestones = [
+        make_milestone("A", datetime(2024, 1, 1)),
+        make_milestone("B", datetime(2024, 2, 1), predecessors={"A"}),
+    ]
+    milestones[0].successors = {"B"}
+    slotted = MilestoneTable(milestones).to_milestones(slots=True)
+    assert all(isinstance(ms, SlottedMilestone) for ms in slotted)
+    assert not hasattr(slotted[0], "__dict__")
+    assert [asdict(ms) for ms in slotted] == [asdict(ms) for ms in milestones]
+    assert slotted[1].short_name == "Milestone B"
@@ -0,0 +1,63 @@
+from argparse import Namespace
+from datetime import datetime
+
+import pytest
+
+from milestones import blockschedule, burndown
+from milestones.provenance import Provenance
+
+# Formats whose metadata savefig() handles differently: the PDF and SVG
+# writers accept different keys, and JPEG accepts none.
+FORMATS = ["pdf", "png", "svg", "jpg"]
+
+
+@pytest.fixture
+def pmcs_data(tmp_path):
+    # Only the name of the extract is used; it is not under version control.
+    return str(tmp_path / "202202-ME.xls")
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_provenance_metadata(extension):
+    provenance = Provenance(
+        "202202-ME.xls", "0123456789ab", datetime(2022, 3, 1), datetime(2022, 2, 1)
+    )
+    metadata = provenance.metadata(f"chart.{extension}")
+    if extension == "jpg":
+        assert metadata is None
+    else:
+        assert provenance.sha in metadata.values()
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_burndown_formats(milestones, pmcs_data, tmp_path, extension):
+    output = tmp_path / f"burndown.{extension}"
+    args = Namespace(
+        start_date=datetime(2020, 10, 1),
+        end_date=datetime(2023, 1, 1),
+        prefix="DM-",
+        horizons=[],
+        granularity="monthly",
+        fan=False,
+        risk_percentile=None,
+        pmcs_data=pmcs_data,
+        output=str(output),
+    )
+    burndown(args, milestones)
+    assert output.stat().st_size > 0
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_blockschedule_formats(milestones, pmcs_data, tmp_path, extension):
+    output = tmp_path / f"blockschedule.{extension}"
+    args = Namespace(
+        start_date="2020-10-01",
+        end_date="2023-06-01",
+        fontsize=5,
+        legend_location=None,
+        show_weeks=False,
+        pmcs_data=pmcs_data,
+        output=str(output),
+    )
+    blockschedule(args, milestones)
+    assert output.stat().st_size > 0
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from milestones import DependencyGraph, Overlay
+
+from .conftest import make_milestone
+
+
+def related(*codes):
+    # Milestones each depending on the one before, with every relation
+    # recorded at both ends as when read from an extract.
+    result = [make_milestone(code, datetime(2024, 1, 1)) for code in codes]
+    for before, after in zip(result, result[1:]):
+        after.predecessors.add(before.code)
+        before.successors.add(after.code)
+    return result
+
+
+def test_removed_relation():
+    milestones = related("A", "B", "C")
+    Overlay.compile({"B": {"predecessors": []}}).apply(milestones)
+    assert milestones[0].successors == set()
+    graph = DependencyGraph.from_milestones(milestones)
+    assert list(graph.edges()) == [("B", "C")]
+
+
+def test_added_relation():
+    milestones = related("A", "B", "C")
+    Overlay.compile({"A": {"successors": ["B", "C"]}}).apply(milestones)
+    assert milestones[2].predecessors == {"A", "B"}
+    graph = DependencyGraph.from_milestones(milestones)
+    assert sorted(graph.edges()) == [("A", "B"), ("A", "C"), ("B", "C")]
+
+
+def test_far_end_not_loaded():
+    # A relation to an activity which is not loaded is only recorded on the
+    # side which is.
+    milestones = related("A", "B")
+    Overlay.compile({"B": {"successors": ["Z"]}}).apply(milestones)
+    assert milestones[1].successors == {"Z"}
+    assert milestones[0].successors == {"B"}
+
+
+def test_overlay_reused():
+    # The same overlay gives the same relations on every load, without
+    # changing its own record of them.
+    local = {"C": {"predecessors": ["A"]}}
+    overlay = Overlay.compile(local)
+    for _ in range(2):
+        milestones = related("A", "B", "C")
+        overlay.apply(milestones)
+        assert [ms.successors for ms in milestones] == [{"B", "C"}, set(), set()]
+    assert local["C"]["predecessors"] == ["A"]
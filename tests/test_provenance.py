@@ -0,0 +1,52 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from milestones.provenance import read_head, read_object, run_git_log
+
+pytestmark = pytest.mark.skipif(not shutil.which("git"), reason="git not installed")
+
+
+def git(directory, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=directory,
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+
+
+@pytest.fixture
+def packed_repository(tmp_path):
+    # A repository of similar commits, repacked so that its objects are
+    # stored as deltas against each other.
+    git(tmp_path, "init", "-q")
+    lines = [f"line {i}\n" for i in range(200)]
+    for i in range(20):
+        lines[i * 7] = f"changed in commit {i}\n"
+        (tmp_path / "data.txt").write_text("".join(lines))
+        git(tmp_path, "add", "data.txt")
+        git(tmp_path, "commit", "-q", "-m", f"Commit {i}\n\n" + "".join(lines[:20]))
+    git(tmp_path, "gc", "-q", "--aggressive")
+    return tmp_path
+
+
+def test_read_head_packed(packed_repository):
+    assert not any(
+        len(name) == 2 for name in os.listdir(packed_repository / ".git" / "objects")
+    )
+    assert read_head(packed_repository) == run_git_log(packed_repository)
+
+
+def test_read_packed_objects(packed_repository):
+    objects_dir = os.path.join(packed_repository, ".git", "objects")
+    listed = git(packed_repository, "rev-list", "--objects", "--all").decode()
+    for line in listed.splitlines():
+        sha = line.split()[0]
+        kind = git(packed_repository, "cat-file", "-t", sha).strip()
+        assert read_object(objects_dir, sha) == (
+            kind,
+            git(packed_repository, "cat-file", kind.decode(), sha),
+        )
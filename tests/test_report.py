@@ -0,0 +1,24 @@
+from argparse import Namespace
+from datetime import datetime
+
+from milestones import report
+
+from .conftest import make_milestone
+
+
+def test_new_milestone_compared_with_baseline(tmp_path):
+    # A milestone with no prior forecast is compared with its due date, as
+    # in the burndown.
+    old = make_milestone("DM-1", datetime(2024, 3, 1), datetime(2024, 3, 11))
+    old.prior_fdue = {1: datetime(2024, 3, 4)}
+    new = make_milestone("DM-2", datetime(2024, 4, 1), datetime(2024, 4, 8))
+    output = tmp_path / "report.csv"
+    args = Namespace(
+        start_date=datetime(2024, 1, 1), prefix="DM", output=output, horizons=[1]
+    )
+    report(args, [old, new])
+    rows = output.read_text().splitlines()[1:]
+    assert rows == [
+        "DM-1,Milestone DM-1,2024-03-11,2024-03-04,7",
+        "DM-2,Milestone DM-2,2024-04-08,2024-04-01,7",
+    ]
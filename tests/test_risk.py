@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import numpy
+
+from milestones import simulate
+from milestones.schedule import to_date
+
+from .conftest import make_milestone
+
+
+def network():
+    # A -> B -> C, where B is a task finishing after C is scheduled, as with
+    # a start-to-start relation or a negative lag, and D follows C a week
+    # later.
+    a = make_milestone("A", datetime(2024, 1, 1))
+    b = make_milestone(
+        "B",
+        datetime(2024, 6, 1),
+        tasktype="Task Dependent",
+        start=datetime(2024, 1, 15),
+    )
+    c = make_milestone("C", datetime(2024, 2, 1))
+    d = make_milestone("D", datetime(2024, 2, 8))
+    a.successors, b.predecessors = {"B"}, {"A"}
+    b.successors, c.predecessors = {"C"}, {"B"}
+    c.successors, d.predecessors = {"D"}, {"C"}
+    return [a, b, c, d]
+
+
+def test_zero_slip_reproduces_forecast():
+    milestones = network()
+    codes = [ms.code for ms in milestones]
+    result = simulate(milestones, codes, trials=10, slips=[0.0], max_workers=1)
+    fdue = [ms.fdue.date() for ms in milestones]
+    assert [to_date(day) for day in result.forecast] == fdue
+    assert [p for p, _, _ in result.percentiles().values()] == fdue
+    assert (result.finish == result.forecast[:, None]).all()
+
+
+def test_slip_passed_on_with_lag():
+    milestones = network()
+    result = simulate(milestones, ["C", "D"], trials=10, slips=[0.5], max_workers=1)
+    # B's duration of 138 days grows by 69, past C's start by 69 days.
+    delay = numpy.unique(result.finish - result.forecast[:, None])
+    assert delay.tolist() == [timedelta(days=69).days]
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from milestones import DependencyGraph, transitive_reduction
+
+
+def random_dag(n, edges, seed):
+    rng = random.Random(seed)
+    relations = set()
+    while len(relations) < edges:
+        a, b = sorted(rng.sample(range(n), 2))
+        relations.add((a, b))
+    preds, succs = zip(*relations)
+    keep = [rng.random() < 0.4 for _ in range(n)]
+    return DependencyGraph([f"A{i}" for i in range(n)], preds, succs), keep
+
+
+def reachable(graph, start, through):
+    # Activities reachable from start along paths whose intermediate
+    # activities all satisfy through.
+    seen, stack = set(), [start]
+    while stack:
+        for w in graph.successor_ids(stack.pop()).tolist():
+            if w not in seen:
+                seen.add(w)
+                if through(w):
+                    stack.append(w)
+    return seen
+
+
+def reduced_edges(graph, keep):
+    # A relation between two kept activities is in the reduction if there is
+    # a path between them through activities which are not kept, and none
+    # through another kept activity.
+    edges = set()
+    for u in range(len(graph)):
+        if not keep[u]:
+            continue
+        for v in reachable(graph, u, lambda w: not keep[w]):
+            if not keep[v]:
+                continue
+            others = reachable(graph, u, lambda w: True)
+            if not any(
+                keep[w] and v in reachable(graph, w, lambda x: True) for w in others
+            ):
+                edges.add((graph.codes[u], graph.codes[v]))
+    return edges
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_transitive_reduction(seed):
+    graph, keep = random_dag(30, 60, seed)
+    reduced = transitive_reduction(graph, keep)
+    assert reduced.codes == [code for code, k in zip(graph.codes, keep) if k]
+    assert set(reduced.edges()) == reduced_edges(graph, keep)
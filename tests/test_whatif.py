@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from milestones import parse_change, reschedule
+
+from .conftest import make_milestone
+
+
+def chain(*codes):
+    # Milestones due a week apart, each depending on the one before.
+    result = []
+    for i, code in enumerate(codes):
+        ms = make_milestone(code, datetime(2024, 1, 1) + timedelta(weeks=i))
+        if i:
+            ms.predecessors = {codes[i - 1]}
+        result.append(ms)
+    return result
+
+
+def test_delay_passed_on():
+    result = reschedule(chain("A", "B", "C"), [parse_change("A fdue +3w")])
+    assert result.affected == ["A", "B", "C"]
+    assert result.moved["C"][1] == datetime(2024, 1, 22)
+
+
+def test_earlier_not_passed_on():
+    result = reschedule(chain("A", "B"), [parse_change("A fdue -1w")])
+    assert list(result.moved) == ["A"]
+
+
+def test_duplicate_codes():
+    milestones = chain("X", "Y")
+    with pytest.raises(ValueError, match="Duplicate activity codes: X"):
+        reschedule([milestones[0]] + milestones, [parse_change("X fdue +30d")])
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [("A fdue", "Expected"), ("A start +3d", "Cannot change start")],
+)
+def test_bad_change(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_change(text)
+
+
+def overlapping():
+    # A -> B -> C, where B finishes after C is scheduled to start, as with
+    # a start-to-start relation or a negative lag.
+    a, b, c = chain("A", "B", "C")
+    b.fdue = datetime(2024, 6, 1)
+    c.fdue = datetime(2024, 2, 1)
+    return [a, b, c]
+
+
+def test_unchanged_predecessor_does_not_push():
+    result = reschedule(overlapping(), [parse_change("A fdue +1d")])
+    assert list(result.moved) == ["A"]
+
+
+def test_moves_bounded_by_change():
+    # C also depends on X, which is unchanged and finishes after C.
+    milestones = overlapping() + chain("P", "Q", "R")
+    x = make_milestone("X", datetime(2024, 3, 1))
+    x.successors = {"C"}
+    milestones[2].predecessors.add("X")
+    changes = [parse_change("A fdue +30d"), parse_change("P fdue +5w")]
+    result = reschedule(milestones + [x], changes)
+    assert sorted(result.moved) == ["A", "P", "Q", "R"]
+    for old, new in result.moved.values():
+        assert timedelta(0) < new - old <= timedelta(weeks=5)
+    assert result.moved["R"][1] - result.moved["R"][0] == timedelta(weeks=3)